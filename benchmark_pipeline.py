@@ -0,0 +1,375 @@
+from pathlib import Path
+from taskManager import OpenFOAMCaseGenerator
+from pipelineMetrics import parse_residuals, parse_solver_log
+from residualAnalysis import analyze_cases
+from contextlib import redirect_stdout
+import json
+import os
+import random
+import shutil
+import stat
+import tempfile
+import time
+
+# ============================
+# USER SETTINGS
+# ============================
+SIZES = [100, 1000, 10000]  # Number of cases per benchmark round
+ROTATIONS_PER_TERRAIN = 8  # Cases per terrain folder (N terrains x M rotations)
+LOG_ITERATIONS = 2000  # Iterations written to each fake log.simpleFoam
+MAX_LOG_CASES = 200  # Residual parsing: logs parsed per round (per-case cost is size independent)
+RESIDUAL_WORKERS = 4  # Processes for the batch residual analysis row
+MAX_SSH_CASES = 1000  # SSH-bound stages: cases timed per round, rest extrapolated
+WORK_DIR = None  # None = temporary directory, removed afterwards
+RESULTS_FILE = None  # Optional path for machine-readable results (JSON)
+SEED = 0
+
+TEMPLATE_PATH = Path(__file__).resolve().parent / "template"
+
+
+# --------------------------------------------------
+# SYNTHETIC INPUT TREE
+# --------------------------------------------------
+
+def make_input_tree(root, n_cases, rotations=ROTATIONS_PER_TERRAIN, seed=SEED):
+    """
+    Create an input tree shaped like generateInputs output:
+    terrain_<idx>_<lat>_<latdec>_<lon>_<londec>/rotatedTerrain_<deg>_deg/
+    with pipeline_metadata.json, a small fake STL and a preview PNG.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    n_terrains = -(-n_cases // rotations)
+    step = 360 // rotations
+
+    # One shared fake geometry payload (~64 kB) keeps generation I/O realistic but bounded
+    stl = "solid terrain\n" + "".join(
+        f"  facet normal 0 0 1\n    outer loop\n"
+        f"      vertex {i} 0 {rng.random():.6f}\n      vertex {i} 1 {rng.random():.6f}\n"
+        f"      vertex {i + 1} 0 {rng.random():.6f}\n    endloop\n  endfacet\n"
+        for i in range(300)
+    ) + "endsolid terrain\n"
+
+    created = 0
+    for t in range(n_terrains):
+        lat, lon = rng.uniform(36, 42), rng.uniform(-9, -6)
+        terrain = root / f"terrain_{t:04d}_{int(lat)}_{int(lat % 1 * 1e4):04d}_{int(lon)}_{int(abs(lon) % 1 * 1e4):04d}"
+        for r in range(rotations):
+            if created >= n_cases:
+                break
+            deg = r * step
+            case_dir = terrain / f"rotatedTerrain_{deg:03d}_deg"
+            (case_dir / "constant" / "triSurface").mkdir(parents=True, exist_ok=True)
+            metadata = {
+                "terrain_index": f"{t:04d}",
+                "rotation_deg": deg,
+                "wind_direction_deg": (270 + deg) % 360,
+                "easting": round(rng.uniform(4e5, 6e5), 2),
+                "northing": round(rng.uniform(4.1e6, 4.6e6), 2),
+                "domain_size_m": 10000
+            }
+            with open(case_dir / "pipeline_metadata.json", "w") as f:
+                json.dump(metadata, f, indent=2)
+            (case_dir / "constant" / "triSurface" / "terrain.stl").write_text(stl)
+            (case_dir / "preview.png").write_bytes(b"\x89PNG fake")
+            created += 1
+    return created
+
+
+# --------------------------------------------------
+# FAKE LOGS / REMOTE
+# --------------------------------------------------
+
+def make_solver_log(n_iterations=LOG_ITERATIONS, seed=SEED):
+    """Text of a log.simpleFoam with n_iterations SIMPLE iterations."""
+    rng = random.Random(seed)
+    lines = ["/*---------------------------------------------------------------------------*\\",
+             "Starting time loop", ""]
+    for it in range(1, n_iterations + 1):
+        decay = 10 ** (-3 * it / n_iterations)
+        lines.append(f"Time = {it}")
+        lines.append("")
+        for field in ("Ux", "Uy", "Uz"):
+            r = decay * rng.uniform(0.5, 1.5) * 1e-2
+            lines.append(f"smoothSolver:  Solving for {field}, Initial residual = {r:.6g}, "
+                         f"Final residual = {r * 0.05:.6g}, No Iterations {rng.randint(1, 4)}")
+        for _ in range(3):  # nNonOrthogonalCorrectors 2 -> three p solves
+            r = decay * rng.uniform(0.5, 1.5) * 1e-1
+            lines.append(f"GAMG:  Solving for p, Initial residual = {r:.6g}, "
+                         f"Final residual = {r * 0.01:.6g}, No Iterations {rng.randint(3, 12)}")
+        lines.append(f"time step continuity errors : sum local = {decay * 1e-5:.6g}, "
+                     f"global = {decay * 1e-7:.6g}, cumulative = {decay * 1e-6:.6g}")
+        for field in ("epsilon", "k"):
+            r = decay * rng.uniform(0.5, 1.5) * 1e-2
+            lines.append(f"smoothSolver:  Solving for {field}, Initial residual = {r:.6g}, "
+                         f"Final residual = {r * 0.05:.6g}, No Iterations {rng.randint(1, 3)}")
+        lines.append(f"ExecutionTime = {it * 0.8:.2f} s  ClockTime = {int(it * 0.82)} s")
+        lines.append("")
+    lines.append("End")
+    return "\n".join(lines) + "\n"
+
+
+def make_remote_tree(remote_root, case_names, end_time=20000, write_interval=5000, log_text=""):
+    """Fake remote case directories: time directories, log files and postProcessing/."""
+    remote_root = Path(remote_root)
+    for name in case_names:
+        case = remote_root / name
+        for t in range(0, end_time + 1, write_interval):
+            (case / str(t)).mkdir(parents=True, exist_ok=True)
+        (case / "postProcessing").mkdir(exist_ok=True)
+        for log in ("log.blockMesh", "log.checkMesh", "log.decomposePar", "log.reconstructPar"):
+            (case / log).write_text("fake\n")
+        (case / "log.simpleFoam").write_text(log_text)
+
+
+FAKE_SSH = """#!/bin/sh
+# ssh <host> <command...>: run the command locally
+shift
+exec sh -c "$*"
+"""
+
+FAKE_RSYNC = """#!/bin/sh
+# Pretend to transfer; print rsync's summary line
+echo "sending incremental file list"
+echo ""
+echo "sent 1,024 bytes  received 65,536 bytes  131,072.00 bytes/sec"
+echo "total size is 65,536  speedup is 1.00"
+"""
+
+FAKE_SBATCH = """#!/bin/sh
+echo "Submitted batch job $(( ($$ * 7919) % 900000 + 100000 ))"
+"""
+
+# Even job IDs are still queued/running; odd ones have left the queue
+FAKE_SQUEUE = """#!/bin/sh
+ids=""; fmt="%T"
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -j) ids="$2"; shift ;;
+        --format=*) fmt="${1#--format=}" ;;
+    esac
+    shift
+done
+for id in $(echo "$ids" | tr ',' ' '); do
+    if [ $((id % 2)) -eq 0 ]; then
+        case "$fmt" in
+            *%i*) echo "$id RUNNING" ;;
+            *) echo "RUNNING" ;;
+        esac
+    fi
+done
+"""
+
+FAKE_SACCT = """#!/bin/sh
+ids=""; fmt="State"
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -j) ids="$2"; shift ;;
+        --format=*) fmt="${1#--format=}" ;;
+    esac
+    shift
+done
+for id in $(echo "$ids" | tr ',' ' '); do
+    case "$fmt" in
+        JobID,State) echo "$id|COMPLETED" ;;
+        Submit,Start,End) echo "2026-01-01T00:00:00|2026-01-01T00:10:00|2026-01-01T06:00:00" ;;
+        *) echo "COMPLETED" ;;
+    esac
+done
+"""
+
+
+def install_fake_binaries(bin_dir):
+    """Write ssh/rsync/sbatch/squeue/sacct stand-ins and put them first on PATH."""
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, text in [("ssh", FAKE_SSH), ("rsync", FAKE_RSYNC), ("sbatch", FAKE_SBATCH),
+                       ("squeue", FAKE_SQUEUE), ("sacct", FAKE_SACCT)]:
+        path = bin_dir / name
+        path.write_text(text)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+
+
+def assign_statuses(generator, cases, seed=SEED):
+    """Spread cases over the pipeline states seen on a real sweep."""
+    rng = random.Random(seed)
+    for i, case in enumerate(cases):
+        roll = rng.random()
+        if roll < 0.2:
+            continue  # NOT_RUN
+        updates = {"mesh_status": "DONE", "mesh_ok": True}
+        if roll < 0.25:
+            updates = {"mesh_status": "FAILED", "mesh_ok": False}
+        elif roll > 0.4:
+            updates.update({
+                "copied_to_hpc": True,
+                "submitted": True,
+                "job_id": str(100000 + i),
+                "job_status": "RUNNING" if i % 2 == 0 else "COMPLETED"
+            })
+        generator.update_status(case, updates)
+
+
+# --------------------------------------------------
+# TIMING
+# --------------------------------------------------
+
+def clear_inventory(generator):
+    """Drop the remote inventory cache, in memory and on disk."""
+    generator._inventory = {}
+    generator.inventory_file.unlink(missing_ok=True)
+
+
+def timed(results, stage, n_cases, func, n_timed=None, n_total=None):
+    """
+    Time func() and append a result row. If only n_timed of n_total items
+    (default n_cases) were processed (sampled stages), the total is
+    extrapolated linearly.
+    """
+    n_total = n_cases if n_total is None else n_total
+    n_timed = n_timed or n_total
+    # The pipeline prints per-case progress; keep it out of the timings and the report
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    total = elapsed * n_total / n_timed if n_timed else elapsed
+    results.append({
+        "stage": stage,
+        "n_cases": n_cases,
+        "n_timed": n_timed,
+        "seconds": total,
+        "ms_per_case": total / n_cases * 1000 if n_cases else None,
+        "cases_per_second": n_cases / total if total > 0 else None,
+        "extrapolated": n_timed < n_total
+    })
+    print(f"  {stage:<28}{total:>10.3f}s{'*' if n_timed < n_total else ' '}"
+          f"{total / n_cases * 1000:>10.3f} ms/case")
+
+
+def run_round(work_dir, n_cases, log_text):
+    work_dir = Path(work_dir)
+    input_dir = work_dir / "inputs"
+    output_dir = work_dir / "outputs"
+    remote_dir = work_dir / "remote"
+
+    generator = OpenFOAMCaseGenerator(
+        template_path=TEMPLATE_PATH,
+        input_dir=input_dir,
+        output_dir=output_dir,
+        deucalion_path=str(remote_dir)
+    )
+    generator.deucalion_host = "fakehost"
+
+    results = []
+    print(f"\n--- {n_cases} cases ---")
+
+    make_input_tree(input_dir, n_cases)
+
+    found = []
+    timed(results, "find_cases", n_cases, lambda: found.extend(generator.find_cases()))
+
+    cases = []
+    timed(results, "setup_case", n_cases, lambda: cases.extend(generator.setup_case(c) for c in found))
+
+    assign_statuses(generator, cases)
+    timed(results, "list_cases_by_status", n_cases, lambda: generator.list_cases_by_status(submitted=True))
+    timed(results, "list_ready_cases", n_cases, generator.list_ready_cases)
+
+    # Residual / solver-log parsing (per-case cost does not depend on dataset size)
+    log_cases = cases[:MAX_LOG_CASES]
+    for case in log_cases:
+        (case / "log.simpleFoam").write_text(log_text)
+    timed(results, "parse_solver_log", n_cases,
+          lambda: [parse_solver_log(c / "log.simpleFoam") for c in log_cases], n_timed=len(log_cases))
+    timed(results, "parse_residuals", n_cases,
+          lambda: [parse_residuals(c / "log.simpleFoam") for c in log_cases], n_timed=len(log_cases))
+    timed(results, f"analyze_cases ({RESIDUAL_WORKERS} procs)", n_cases,
+          lambda: analyze_cases(log_cases, n_workers=RESIDUAL_WORKERS, plots=False), n_timed=len(log_cases))
+
+    # SSH-bound stages against the fake remote
+    ssh_cases = cases[:MAX_SSH_CASES]
+    make_remote_tree(remote_dir, [c.name for c in ssh_cases], log_text="Time = 1\n")
+
+    def cold_timesteps(case):
+        # Empty inventory cache: every lookup lists the remote case over SSH
+        clear_inventory(generator)
+        return generator.get_result_timesteps(f"{remote_dir}/{case.name}")
+
+    timed(results, "get_result_timesteps (cold)", n_cases,
+          lambda: [cold_timesteps(c) for c in ssh_cases], n_timed=len(ssh_cases))
+    timed(results, "get_remote_inventory", n_cases,
+          lambda: generator.get_remote_inventory(ssh_cases, max_age=0), n_timed=len(ssh_cases))
+    timed(results, "get_result_timesteps (cached)", n_cases,
+          lambda: [generator.get_result_timesteps(f"{remote_dir}/{c.name}") for c in ssh_cases],
+          n_timed=len(ssh_cases))
+    timed(results, "fetch_case_results", n_cases,
+          lambda: [generator.fetch_case_results(c) for c in ssh_cases], n_timed=len(ssh_cases))
+
+    job_ids = [generator.get_status(c).get("job_id") for c in cases]
+    job_ids = [j for j in job_ids if j]
+    timed(results, "check_job_statuses (batched)", n_cases,
+          lambda: [generator.check_job_statuses(job_ids[i:i + 200]) for i in range(0, len(job_ids), 200)])
+    # Per-job baseline: one call per job ID (not every case has one), sampled
+    sample = job_ids[:MAX_SSH_CASES // 10]
+    timed(results, "check_job_status (per job)", n_cases,
+          lambda: [generator.check_job_status(j) for j in sample],
+          n_timed=max(len(sample), 1), n_total=len(job_ids))
+
+    return results
+
+
+def print_table(all_results):
+    stages = list(dict.fromkeys(r["stage"] for r in all_results))
+    sizes = sorted({r["n_cases"] for r in all_results})
+
+    print("\n" + "="*60)
+    print("BENCHMARK SUMMARY (seconds, * = extrapolated from a sample)")
+    print("="*60)
+    print(f"{'stage':<30}" + "".join(f"{n:>12}" for n in sizes))
+    for stage in stages:
+        row = f"{stage:<30}"
+        for n in sizes:
+            r = next((r for r in all_results if r["stage"] == stage and r["n_cases"] == n), None)
+            cell = "-" if r is None else f"{r['seconds']:.3f}{'*' if r['extrapolated'] else ''}"
+            row += f"{cell:>12}"
+        print(row)
+
+    # Scaling exponent between smallest and largest size: ~1 linear, >1 superlinear
+    if len(sizes) >= 2:
+        print(f"\nScaling (time ratio {sizes[-1]}/{sizes[0]} cases, linear = {sizes[-1] / sizes[0]:.0f}x):")
+        for stage in stages:
+            small = next((r for r in all_results if r["stage"] == stage and r["n_cases"] == sizes[0]), None)
+            large = next((r for r in all_results if r["stage"] == stage and r["n_cases"] == sizes[-1]), None)
+            if small and large and small["seconds"] > 0:
+                print(f"  {stage:<28}{large['seconds'] / small['seconds']:>10.1f}x")
+
+
+# ============================
+# MAIN
+# ============================
+if __name__ == "__main__":
+    root = Path(WORK_DIR) if WORK_DIR else Path(tempfile.mkdtemp(prefix="of_bench_"))
+    install_fake_binaries(root / "bin")
+    log_text = make_solver_log()
+
+    print(f"Benchmark work directory: {root}")
+    print(f"Fake log.simpleFoam: {LOG_ITERATIONS} iterations, {len(log_text) / 1e6:.1f} MB")
+
+    all_results = []
+    try:
+        for n in SIZES:
+            round_dir = root / f"n{n}"
+            all_results.extend(run_round(round_dir, n, log_text))
+            shutil.rmtree(round_dir, ignore_errors=True)
+    finally:
+        if WORK_DIR is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print_table(all_results)
+
+    if RESULTS_FILE:
+        with open(RESULTS_FILE, "w") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"\nResults written to {RESULTS_FILE}")
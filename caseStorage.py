@@ -0,0 +1,232 @@
+import os
+import shutil
+import subprocess
+import tarfile
+import zlib
+from pathlib import Path
+
+
+MESH_DIR = "constant/polyMesh"
+ARCHIVE_SUFFIX = ".tar.gz"
+SAMPLE_BYTES = 1 << 20  # Compression ratio estimate from the first MiB of the largest file
+STORAGE_STATES = {"prune": "pruned", "compress": "compressed"}
+
+
+# --------------------------------------------------
+# SIZES
+# --------------------------------------------------
+
+def disk_usage(path):
+    """Bytes allocated on disk under path (what deleting it would free)."""
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_blocks * 512
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def estimate_compressed(path, size):
+    """Estimated size after gzip, from compressing a sample of the largest file."""
+    largest, largest_size = None, -1
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(root, name)
+            file_size = os.path.getsize(file_path)
+            if file_size > largest_size:
+                largest, largest_size = file_path, file_size
+    if largest is None or largest_size == 0:
+        return size
+
+    with open(largest, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+    ratio = len(zlib.compress(sample, 6)) / len(sample)
+    return int(size * ratio)
+
+
+def time_dirs(case_path):
+    """Numeric result directories of a case, except the initial conditions in 0/."""
+    return sorted(
+        (p for p in Path(case_path).iterdir() if p.is_dir() and p.name.isdigit() and p.name != "0"),
+        key=lambda p: int(p.name)
+    )
+
+
+# --------------------------------------------------
+# PLANNING
+# --------------------------------------------------
+
+def plan_case(case_path, status, mesh_mode="prune", compress_fields=True):
+    """
+    Storage actions for one case, based on its status.
+
+    - Uploaded cases (copied_to_hpc): constant/polyMesh is pruned (it is
+      regenerated by rerunning blockMesh) or compressed (mesh_mode).
+    - Fetched cases (results_fetched): result time directories are
+      compressed; they are not pruned since they can't be regenerated locally.
+
+    Compress actions whose estimated saving is not positive are left out.
+
+    Returns a list of {"case", "target", "kind", "action", "bytes", "reclaimable"}.
+    """
+    case_path = Path(case_path)
+    actions = []
+    if not status:
+        return actions
+
+    mesh = case_path / MESH_DIR
+    if status.get("copied_to_hpc") and mesh.is_dir() and mesh_mode in ("prune", "compress"):
+        size = disk_usage(mesh)
+        reclaimable = size if mesh_mode == "prune" else size - estimate_compressed(mesh, size)
+        actions.append({"case": case_path.name, "target": MESH_DIR, "kind": "mesh",
+                        "action": mesh_mode, "bytes": size, "reclaimable": reclaimable})
+
+    if status.get("results_fetched") and compress_fields:
+        for time_dir in time_dirs(case_path):
+            size = disk_usage(time_dir)
+            actions.append({"case": case_path.name, "target": time_dir.name, "kind": "fields",
+                            "action": "compress", "bytes": size,
+                            "reclaimable": size - estimate_compressed(time_dir, size)})
+
+    # Archiving data that doesn't compress (e.g. binary fields) would only cost time
+    return [a for a in actions if a["action"] != "compress" or a["reclaimable"] > 0]
+
+
+def plan(generator, cases=None, mesh_mode="prune", compress_fields=True):
+    """Storage actions for the given cases (default: every case in the output directory)."""
+    cases = cases if cases is not None else generator.list_cases_by_status()
+    actions = []
+    for case in cases:
+        actions.extend(plan_case(case, generator.get_status(case), mesh_mode, compress_fields))
+    return actions
+
+
+# --------------------------------------------------
+# APPLY / RESTORE
+# --------------------------------------------------
+
+def compress_dir(path):
+    """Write path.tar.gz next to path, check it can be read back, then delete path."""
+    path = Path(path)
+    archive = path.with_name(path.name + ARCHIVE_SUFFIX)
+    tmp = archive.with_name(archive.name + ".tmp")
+    with tarfile.open(tmp, "w:gz", compresslevel=6) as tar:
+        tar.add(path, arcname=path.name)
+    with tarfile.open(tmp, "r:gz") as tar:
+        n_members = len(tar.getmembers())
+    n_expected = 1 + sum(len(dirs) + len(files) for _, dirs, files in os.walk(path))
+    if n_members != n_expected:
+        tmp.unlink()
+        raise RuntimeError(f"archive of {path} has {n_members} entries, expected {n_expected}")
+    os.replace(tmp, archive)
+    shutil.rmtree(path)
+    return archive
+
+
+def apply_actions(generator, actions):
+    """Carry out planned actions and record them under "storage" in case_status.json."""
+    freed = 0
+    for action in actions:
+        case_path = generator.output_dir / action["case"]
+        target = case_path / action["target"]
+        if not target.is_dir():
+            continue
+
+        try:
+            if action["action"] == "prune":
+                shutil.rmtree(target)
+                freed += action["bytes"]
+            else:
+                archive = compress_dir(target)
+                freed += action["bytes"] - disk_usage(archive)
+        except (OSError, RuntimeError, tarfile.TarError) as e:
+            print(f"[STORAGE ERROR] {action['case']}/{action['target']}: {e}")
+            continue
+
+        storage = (generator.get_status(case_path) or {}).get("storage", {})
+        storage[action["target"]] = STORAGE_STATES[action["action"]]
+        generator.update_status(case_path, {"storage": storage})
+        print(f"[STORAGE] {action['case']}: {action['action']} {action['target']}")
+    return freed
+
+
+def restore_case(generator, case_path):
+    """
+    Bring back pruned or compressed data of a case: unpack archives and
+    rerun blockMesh (Allrun RUN_STAGE=mesh) for a pruned mesh.
+    Returns True if everything was restored.
+    """
+    case_path = Path(case_path)
+    status = generator.get_status(case_path) or {}
+    storage = dict(status.get("storage", {}))
+    ok = True
+
+    for target, state in sorted(storage.items()):
+        try:
+            if state == "compressed":
+                archive = case_path / (target + ARCHIVE_SUFFIX)
+                with tarfile.open(archive, "r:gz") as tar:
+                    tar.extractall((case_path / target).parent, filter="data")
+                archive.unlink()
+            elif state == "pruned" and target == MESH_DIR:
+                # RunFunctions refuses to rerun an application whose log exists
+                for log in ("log.blockMesh", "log.checkMesh"):
+                    (case_path / log).unlink(missing_ok=True)
+                env = os.environ.copy()
+                env["RUN_STAGE"] = "mesh"
+                subprocess.run(["bash", "Allrun"], cwd=case_path, env=env, check=True,
+                               capture_output=True, text=True)
+            else:
+                raise RuntimeError(f"don't know how to restore {state} {target}")
+        except (OSError, RuntimeError, tarfile.TarError, subprocess.CalledProcessError) as e:
+            print(f"[RESTORE ERROR] {case_path.name}/{target}: {e}")
+            ok = False
+            continue
+
+        del storage[target]
+        print(f"[RESTORED] {case_path.name}: {target}")
+
+    generator.update_status(case_path, {"storage": storage})
+    return ok
+
+
+# --------------------------------------------------
+# REPORT
+# --------------------------------------------------
+
+def format_bytes(n):
+    for unit in ("B", "kB", "MB", "GB", "TB"):
+        if abs(n) < 1000 or unit == "TB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1000
+
+
+def summarize_plan(actions):
+    summary = {}
+    for a in actions:
+        key = f"{a['kind']}:{a['action']}"
+        s = summary.setdefault(key, {"cases": set(), "items": 0, "bytes": 0, "reclaimable": 0})
+        s["cases"].add(a["case"])
+        s["items"] += 1
+        s["bytes"] += a["bytes"]
+        s["reclaimable"] += a["reclaimable"]
+    return {k: {**v, "cases": len(v["cases"])} for k, v in summary.items()}
+
+
+def print_plan(actions):
+    summary = summarize_plan(actions)
+    if not summary:
+        print("Nothing to reclaim.")
+        return
+    print(f"{'data':<20}{'cases':>8}{'items':>8}{'size':>12}{'reclaimable':>14}")
+    print("-" * 62)
+    for key, s in sorted(summary.items()):
+        print(f"{key:<20}{s['cases']:>8}{s['items']:>8}{format_bytes(s['bytes']):>12}"
+              f"{format_bytes(s['reclaimable']):>14}")
+    total = sum(s["reclaimable"] for s in summary.values())
+    print(f"\nReclaimable: {format_bytes(total)} (compressed sizes estimated from a sample)")
@@ -0,0 +1,519 @@
+import asyncio
+import itertools
+import statistics
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+
+ACTIVE_STATES = {"PENDING", "RUNNING", "CONFIGURING", "COMPLETING", "REQUEUED", "RESIZING", "SUSPENDED"}
+RESUBMIT_STATES = {"TIMEOUT", "NODE_FAIL", "PREEMPTED", "BOOT_FAIL"}
+FAILED_STATES = {"FAILED", "CANCELLED", "OUT_OF_MEMORY", "DEADLINE"}
+
+
+def parse_walltime(walltime):
+    """Convert a Slurm walltime string ("D-HH:MM:SS", "HH:MM:SS" or "MM:SS") to seconds."""
+    days = 0
+    if "-" in walltime:
+        day_part, walltime = walltime.split("-", 1)
+        days = int(day_part)
+    seconds = 0
+    for part in walltime.split(":"):
+        seconds = seconds * 60 + int(part)
+    return days * 86400 + seconds
+
+
+# --------------------------------------------------
+# SCHEDULER BACKENDS
+# --------------------------------------------------
+
+class SlurmBackend:
+    """Talks to Slurm on deucalion through the OpenFOAMCaseGenerator SSH helpers."""
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def query_states(self, job_ids):
+        return self.generator.check_job_statuses(job_ids)
+
+    def submit(self, case_path):
+        """Copy (if needed) and submit a case. Returns the job ID or None."""
+        status = self.generator.get_status(case_path) or {}
+        if not status.get("copied_to_hpc"):
+            if not self.generator.copy_to_deucalion(case_path):
+                return None
+        return self.generator.submit_case(case_path)
+
+    def prepare_resubmit(self, case_path, attempt):
+        return self.generator.prepare_resubmit(case_path, attempt)
+
+    def fetch(self, case_path):
+        return self.generator.fetch_case_results(case_path)
+
+    def record_job_metrics(self, case_path, job_status):
+        self.generator.record_job_metrics(case_path, job_status)
+
+    def refresh_inventory(self, case_paths):
+        """List all remote cases about to be fetched in one SSH call."""
+        self.generator.get_remote_inventory(case_paths, max_age=0)
+
+    def queue_counts(self):
+        return self.generator.get_queue_counts()
+
+
+class FakeScheduler:
+    """
+    Local stand-in for Slurm, used to exercise the monitor without SSH.
+
+    Each submitted job stays PENDING for `queue_seconds`, RUNNING for
+    `run_seconds`, then ends in COMPLETED (or whatever `outcome` returns
+    for the case). Per-case overrides can be given via `outcome`, a
+    callable taking the case name and returning the final state.
+    With `submit_limit`, submissions beyond that many queued jobs are
+    rejected like a Slurm QOS limit would. `clock` (default time.monotonic)
+    lets tests step time by hand.
+    """
+
+    def __init__(self, generator, queue_seconds=1.0, run_seconds=2.0, outcome=None, submit_limit=None,
+                 clock=time.monotonic):
+        self.generator = generator
+        self.clock = clock
+        self.queue_seconds = queue_seconds
+        self.run_seconds = run_seconds
+        self.outcome = outcome or (lambda case_name: "COMPLETED")
+        self.submit_limit = submit_limit
+        self.jobs = {}
+        self.fetched = []
+        self.prepared = []
+        self._ids = itertools.count(1000)
+
+    def _state(self, job):
+        elapsed = self.clock() - job["submitted"]
+        if elapsed < self.queue_seconds:
+            return "PENDING"
+        if elapsed < self.queue_seconds + self.run_seconds:
+            return "RUNNING"
+        return job["final_state"]
+
+    def query_states(self, job_ids):
+        return {str(j): self._state(self.jobs[str(j)]) for j in job_ids if str(j) in self.jobs}
+
+    def queue_counts(self):
+        return dict(Counter(s for s in (self._state(j) for j in list(self.jobs.values())) if s in ACTIVE_STATES))
+
+    def submit(self, case_path):
+        case_path = Path(case_path)
+        if self.submit_limit is not None and sum(self.queue_counts().values()) >= self.submit_limit:
+            print(f"[SUBMIT FAILED] {case_path.name}: QOSMaxSubmitJobPerUserLimit")
+            self.generator.submit_limit_hit = True
+            return None
+        job_id = str(next(self._ids))
+        self.jobs[job_id] = {
+            "case": case_path.name,
+            "submitted": self.clock(),
+            "final_state": self.outcome(case_path.name),
+        }
+        self.generator.update_status(case_path, {
+            "copied_to_hpc": True,
+            "submitted": True,
+            "job_id": job_id,
+            "job_status": "PENDING",
+            "submitted_at": datetime.now().isoformat(),
+            "last_checked": datetime.now().isoformat()
+        })
+        return job_id
+
+    def prepare_resubmit(self, case_path, attempt):
+        self.prepared.append((Path(case_path).name, attempt))
+        return True
+
+    def fetch(self, case_path):
+        self.fetched.append(Path(case_path).name)
+        self.generator.update_status(case_path, {"results_fetched": True, "run_complete": True})
+        return True
+
+    def refresh_inventory(self, case_paths):
+        pass
+
+    def record_job_metrics(self, case_path, job_status):
+        metrics = self.generator.metrics
+        metrics.record(case_path, "queue", "end", duration=self.queue_seconds, ok=True)
+        metrics.record(case_path, "solve", "end", duration=self.run_seconds,
+                       job_status=job_status, ok=job_status == "COMPLETED")
+
+
+# --------------------------------------------------
+# SUBMISSION CONTROL
+# --------------------------------------------------
+
+def terrain_of(case):
+    """Terrain group of a case: "case_0001_210deg" -> "case_0001"."""
+    return Path(case).name.rsplit("_", 1)[0]
+
+
+class SubmissionController:
+    """
+    Decides which ready cases to submit, and how many.
+
+    Keeps at most `queue_target` of our jobs pending or running on the
+    partition (counted with squeue, so jobs submitted outside the pipeline
+    count too), at most `max_pending` of them pending. Ready cases are
+    sorted by the keys in `order`:
+
+    - "terrain": terrains with the most cases already submitted first, so
+      the rotations of a terrain finish together
+    - "longest" / "shortest": predicted runtime, i.e. cell count (every
+      case runs the same number of iterations)
+    - "name"
+
+    When sbatch rejects a job for a submit limit, the queue size seen at
+    the next check becomes the target.
+    """
+
+    ORDER_KEYS = ("terrain", "longest", "shortest", "name")
+
+    def __init__(self, generator, queue_target=None, max_pending=None, order=("terrain", "longest")):
+        unknown = set(order) - set(self.ORDER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown submit order key(s): {', '.join(sorted(unknown))}")
+        self.generator = generator
+        self.queue_target = queue_target
+        self.max_pending = max_pending
+        self.order = list(order)
+        self.learned_limit = None
+        self._cells = {}
+
+    def needs_queue_counts(self):
+        return self.queue_target is not None or self.max_pending is not None \
+            or self.learned_limit is not None or self.generator.submit_limit_hit
+
+    def cells(self, case):
+        """Cell count of a meshed case (0 if unknown), cached: it doesn't change once meshed."""
+        name = Path(case).name
+        if name not in self._cells:
+            self._cells[name] = self.generator.get_cell_count(case) or 0
+        return self._cells[name]
+
+    def sort_cases(self, cases, submitted=None):
+        if "terrain" in self.order:
+            if submitted is None:
+                submitted = self.generator.list_cases_by_status(submitted=True)
+            started = Counter(terrain_of(c) for c in submitted)
+
+        def key(case):
+            parts = []
+            for k in self.order:
+                if k == "terrain":
+                    parts += [-started[terrain_of(case)], terrain_of(case)]
+                elif k == "longest":
+                    parts.append(-self.cells(case))
+                elif k == "shortest":
+                    parts.append(self.cells(case))
+                else:
+                    parts.append(Path(case).name)
+            return parts
+
+        return sorted(cases, key=key)
+
+    def available_slots(self, counts, n_in_flight=0):
+        """How many more jobs may be submitted now (None = no limit)."""
+        if self.generator.submit_limit_hit and counts is not None:
+            self.generator.submit_limit_hit = False
+            queued = sum(n for state, n in counts.items() if state in ACTIVE_STATES)
+            self.learned_limit = queued if self.learned_limit is None else min(self.learned_limit, queued)
+            print(f"[SUBMIT] Submit limit reached: keeping at most {self.learned_limit} jobs queued")
+
+        if not self.needs_queue_counts():
+            return None
+        if counts is None:
+            # Can't see the queue: don't risk flooding it
+            return 0
+
+        queued = sum(n for state, n in counts.items() if state in ACTIVE_STATES)
+        targets = [t for t in (self.queue_target, self.learned_limit) if t is not None]
+        slots = []
+        if targets:
+            slots.append(min(targets) - queued - n_in_flight)
+        if self.max_pending is not None:
+            slots.append(self.max_pending - counts.get("PENDING", 0) - n_in_flight)
+        return max(0, min(slots)) if slots else None
+
+    def select(self, ready, counts, n_in_flight=0, submitted=None):
+        """The ready cases to submit now, in priority order."""
+        slots = self.available_slots(counts, n_in_flight)
+        if slots == 0:
+            return []
+        ordered = self.sort_cases(ready, submitted)
+        return ordered if slots is None else ordered[:slots]
+
+
+# --------------------------------------------------
+# MONITOR
+# --------------------------------------------------
+
+class JobMonitor:
+    """
+    Long-running asyncio monitor for submitted cases.
+
+    Instead of sleeping for a fixed interval, the next poll is scheduled
+    for when the earliest running job is expected to finish (estimated
+    from the runtimes of jobs that already completed, falling back to
+    the walltime), clamped to [min_interval, max_interval]. State changes
+    trigger result fetching, resubmission of TIMEOUT/NODE_FAIL jobs and
+    follow-up submission of ready cases straight away (a fetched run that
+    stopped short of endTime is resubmitted like a TIMEOUT); how many and which
+    ready cases are submitted is up to the SubmissionController. Remote
+    calls run in worker threads, at most `max_concurrent` at a time.
+    Retry backoffs are timed with `clock` (default time.monotonic).
+    """
+
+    def __init__(self, generator, backend=None, controller=None, min_interval=60, max_interval=1800,
+                 max_concurrent=4, max_resubmits=2, auto_fetch=True, auto_submit=True, batch_size=200,
+                 clock=time.monotonic):
+        self.generator = generator
+        self.clock = clock
+        self.backend = backend or SlurmBackend(generator)
+        self.controller = controller or SubmissionController(generator)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_concurrent = max_concurrent
+        self.max_resubmits = max_resubmits
+        self.auto_fetch = auto_fetch
+        self.auto_submit = auto_submit
+        self.batch_size = batch_size
+
+        self.walltime_seconds = parse_walltime(generator.hpc_defaults["walltime"])
+        self.runtimes = []
+        self.iteration = 0
+
+        self._semaphore = None
+        self._wake = None
+        self._in_flight = set()
+        self._tasks = set()
+        self._retry = {}  # (action, case name) -> (failed attempts, monotonic time of next attempt)
+
+    # ---------------- remote calls ----------------
+
+    async def _call(self, func, *args):
+        """Run a blocking backend call in a thread, bounded by the semaphore."""
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    def _spawn(self, key, coro):
+        """Start a background action unless one is already running for this key."""
+        if key in self._in_flight:
+            coro.close()
+            return
+        self._in_flight.add(key)
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+
+        def _done(t):
+            self._tasks.discard(t)
+            self._in_flight.discard(key)
+            # A (re)submission changes the queue; poll again promptly. Fetches and
+            # metrics don't change what happens next and wait for the regular poll.
+            if key[0] == "submit":
+                self._wake.set()
+
+        task.add_done_callback(_done)
+
+    async def _query_all(self, job_ids):
+        batches = [job_ids[i:i + self.batch_size] for i in range(0, len(job_ids), self.batch_size)]
+        results = await asyncio.gather(*(self._call(self.backend.query_states, b) for b in batches))
+        states = {}
+        for r in results:
+            states.update(r)
+        return states
+
+    # ---------------- actions ----------------
+
+    def _back_off(self, key):
+        """Delay the next attempt of a failed action: min_interval, doubling up to max_interval."""
+        failures = self._retry.get(key, (0, 0))[0] + 1
+        delay = min(max(self.min_interval, self.max_interval), self.min_interval * 2 ** (failures - 1))
+        self._retry[key] = (failures, self.clock() + delay)
+        print(f"[MONITOR] {key[0].capitalize()} failed ({failures}x), retrying in {delay / 60:.1f} min: {key[1]}")
+
+    def _due(self, key):
+        retry = self._retry.get(key)
+        return retry is None or self.clock() >= retry[1]
+
+    async def _fetch(self, case):
+        print(f"[MONITOR] Fetching results: {case.name}")
+        ok = await self._call(self.backend.fetch, case)
+        if ok:
+            self._retry.pop(("fetch", case.name), None)
+        else:
+            self._back_off(("fetch", case.name))
+
+    async def _record_metrics(self, case, state):
+        await self._call(self.backend.record_job_metrics, case, state)
+
+    @staticmethod
+    def _unfinished(status):
+        """Job ended before the run reached endTime: timed out, or fetched and found short."""
+        if status.get("job_status") in RESUBMIT_STATES:
+            return True
+        return status.get("job_status") == "COMPLETED" and status.get("results_fetched") \
+            and status.get("run_complete") is False
+
+    async def _resubmit(self, case, status):
+        n = status.get("n_resubmits", 0) + 1
+        reason = status.get("job_status") if status.get("job_status") in RESUBMIT_STATES \
+            else f"stopping at {status.get('last_fetched_timestep')}"
+        print(f"[MONITOR] Resubmitting {case.name} after {reason} (attempt {n})")
+        # Allrun skips applications whose log exists: clear the solver logs first so
+        # the new job continues the run from the latest time instead of doing nothing
+        job_id = None
+        if await self._call(self.backend.prepare_resubmit, case, n):
+            job_id = await self._call(self.backend.submit, case)
+        if job_id:
+            self._retry.pop(("submit", case.name), None)
+            self.generator.update_status(case, {"n_resubmits": n, "started_at": None, "finished_at": None,
+                                                "results_fetched": False, "run_complete": None})
+        else:
+            self._back_off(("submit", case.name))
+
+    async def _submit(self, case):
+        job_id = await self._call(self.backend.submit, case)
+        if job_id:
+            print(f"[MONITOR] Submitted {case.name} -> Job {job_id}")
+
+    # ---------------- polling ----------------
+
+    def _record_transition(self, case, status, new_state):
+        now = datetime.now().isoformat()
+        updates = {"job_status": new_state, "last_checked": now}
+
+        if new_state == "RUNNING" and not status.get("started_at"):
+            updates["started_at"] = now
+        if new_state not in ACTIVE_STATES and not status.get("finished_at"):
+            updates["finished_at"] = now
+            if new_state == "COMPLETED" and status.get("started_at"):
+                started = datetime.fromisoformat(status["started_at"])
+                self.runtimes.append((datetime.now() - started).total_seconds())
+
+        self.generator.update_status(case, updates)
+        status.update(updates)
+
+    def _expected_runtime(self):
+        if self.runtimes:
+            return statistics.median(self.runtimes)
+        return self.walltime_seconds
+
+    def next_interval(self, active_statuses):
+        """Seconds until the next poll, based on when running jobs are expected to finish."""
+        if not active_statuses:
+            return self.max_interval
+
+        expected = self._expected_runtime()
+        now = datetime.now()
+        remaining = []
+        for status in active_statuses:
+            started = status.get("started_at")
+            if status.get("job_status") != "RUNNING" or not started:
+                continue
+            elapsed = (now - datetime.fromisoformat(started)).total_seconds()
+            remaining.append(expected - elapsed)
+
+        if not remaining:
+            # Only pending jobs: they may start at any time, but nothing will finish soon
+            return self.max_interval
+        return max(self.min_interval, min(self.max_interval, min(remaining)))
+
+    async def poll_once(self):
+        """One monitoring pass. Returns the number of seconds to wait before the next one."""
+        self.iteration += 1
+        submitted = self.generator.list_cases_by_status(submitted=True)
+
+        tracked = []
+        for case in submitted:
+            status = self.generator.get_status(case)
+            if not status or not status.get("job_id"):
+                continue
+            if status.get("job_status") in ACTIVE_STATES or status.get("job_status") is None:
+                tracked.append((case, status))
+            elif status.get("job_status") == "COMPLETED" and not status.get("results_fetched"):
+                tracked.append((case, status))
+            elif self._unfinished(status) and status.get("n_resubmits", 0) < self.max_resubmits:
+                tracked.append((case, status))
+
+        states = await self._query_all([s["job_id"] for _, s in tracked])
+
+        active = []
+        to_fetch = []
+        for case, status in tracked:
+            new_state = states.get(str(status["job_id"]))
+            changed = bool(new_state) and new_state != status.get("job_status")
+            if changed:
+                print(f"[MONITOR] {case.name}: Job {status['job_id']} {status.get('job_status')} -> {new_state}")
+                self._record_transition(case, status, new_state)
+                if new_state not in ACTIVE_STATES:
+                    self._spawn(("metrics", case.name), self._record_metrics(case, new_state))
+
+            state = status.get("job_status")
+            if state in ACTIVE_STATES:
+                active.append(status)
+            elif self._unfinished(status):
+                if status.get("n_resubmits", 0) < self.max_resubmits:
+                    if self._due(("submit", case.name)):
+                        self._spawn(("submit", case.name), self._resubmit(case, status))
+                    active.append(status)
+                elif changed:
+                    print(f"[MONITOR] {case.name}: {state} and out of resubmits, needs investigation")
+            elif state == "COMPLETED":
+                if self.auto_fetch and not status.get("results_fetched") \
+                        and ("fetch", case.name) not in self._in_flight and self._due(("fetch", case.name)):
+                    to_fetch.append(case)
+            elif state in FAILED_STATES and changed:
+                print(f"[MONITOR] {case.name}: Job {status['job_id']} {state}, needs investigation")
+
+        if to_fetch:
+            await self._call(self.backend.refresh_inventory, to_fetch)
+            for case in to_fetch:
+                self._spawn(("fetch", case.name), self._fetch(case))
+
+        if self.auto_submit:
+            await self._submit_ready(submitted)
+
+        print(f"[MONITOR] Poll {self.iteration}: {len(active)} active, "
+              f"{len(self._in_flight)} action(s) in flight")
+        return self.next_interval(active)
+
+    async def _submit_ready(self, submitted):
+        """Top the queue up with ready cases, in priority order."""
+        ready = [c for c in self.generator.list_ready_cases() if ("submit", c.name) not in self._in_flight]
+        if not ready:
+            return
+        n_in_flight = sum(1 for key in self._in_flight if key[0] == "submit")
+        counts = None
+        if self.controller.needs_queue_counts():
+            counts = await self._call(self.backend.queue_counts)
+        for case in self.controller.select(ready, counts, n_in_flight, submitted):
+            self._spawn(("submit", case.name), self._submit(case))
+
+    async def run(self, max_iterations=None):
+        """Poll until cancelled (or for max_iterations passes)."""
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._wake = asyncio.Event()
+
+        try:
+            while True:
+                self._wake.clear()
+                interval = await self.poll_once()
+
+                if max_iterations and self.iteration >= max_iterations:
+                    break
+
+                print(f"[MONITOR] Next poll in {interval / 60:.1f} min")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=interval)
+                    # An action finished; give others a moment to settle before re-polling
+                    await asyncio.sleep(min(self.min_interval, 5))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
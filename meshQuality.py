@@ -0,0 +1,140 @@
+import json
+import os
+from multiprocessing import Pool
+from pathlib import Path
+
+from pipelineMetrics import load_events, parse_check_mesh, percentile
+
+
+QUALITY_METRICS = ["cells", "max_non_orthogonality", "max_skewness", "max_aspect_ratio"]
+
+# checkMesh's own limits: beyond these it reports the check as failed
+DEFAULT_LIMITS = {
+    "max_non_orthogonality": 70,
+    "max_skewness": 4,
+    "max_aspect_ratio": 1000
+}
+
+
+# --------------------------------------------------
+# TABLE
+# --------------------------------------------------
+
+def load_table(path):
+    """Latest checkMesh figures per case from mesh_quality.jsonl: {case: entry}."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    # Later lines win: a case meshed twice keeps its last result
+    return {e["case"]: e for e in load_events(path) if "case" in e}
+
+
+def rebuild_table(generator, n_workers=4):
+    """
+    Re-parse log.checkMesh of every meshed case in a process pool, store the
+    figures in each case status and rewrite the table (for cases meshed
+    before the figures were recorded, or after editing logs by hand).
+    """
+    cases = [c for c in generator.list_cases_by_status() if (c / "log.checkMesh").exists()]
+    with Pool(processes=n_workers) as pool:
+        results = pool.map(parse_check_mesh, [c / "log.checkMesh" for c in cases], chunksize=16)
+
+    table = {}
+    for case, quality in zip(cases, results):
+        generator.update_status(case, {"mesh_quality": quality})
+        table[case.name] = {"case": case.name, **quality}
+
+    path = generator.mesh_quality_file
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        for entry in table.values():
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp, path)
+    return table
+
+
+# --------------------------------------------------
+# QUERIES
+# --------------------------------------------------
+
+def summarize(table):
+    """p50/p90/p99/max of each metric over the dataset."""
+    summary = {}
+    for metric in QUALITY_METRICS:
+        values = [e[metric] for e in table.values() if e.get(metric) is not None]
+        summary[metric] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else None
+        }
+    summary["failed"] = sum(1 for e in table.values() if not e.get("mesh_ok"))
+    return summary
+
+
+def find_outliers(table, limits=None, z_threshold=3.5):
+    """
+    Cases whose figures exceed a limit, or lie far from the rest of the
+    dataset: robust z-score (distance from the median in units of the
+    median absolute deviation) above z_threshold.
+
+    Returns [{"case", "metric", "value", "reason"}], worst first.
+    """
+    limits = DEFAULT_LIMITS if limits is None else limits
+    outliers = []
+
+    for metric in QUALITY_METRICS:
+        values = [e[metric] for e in table.values() if e.get(metric) is not None]
+        if not values:
+            continue
+        median = percentile(values, 50)
+        mad = percentile([abs(v - median) for v in values], 50)
+        limit = limits.get(metric)
+
+        for case, e in table.items():
+            value = e.get(metric)
+            if value is None:
+                continue
+            z = 0.6745 * (value - median) / mad if mad else 0.0
+            if limit is not None and value > limit:
+                outliers.append({"case": case, "metric": metric, "value": value,
+                                 "reason": f"> {limit}", "severity": value / limit + abs(z)})
+            elif abs(z) > z_threshold:
+                outliers.append({"case": case, "metric": metric, "value": value,
+                                 "reason": f"z = {z:+.1f}", "severity": abs(z)})
+
+    outliers.sort(key=lambda o: o["severity"], reverse=True)
+    return outliers
+
+
+# --------------------------------------------------
+# REPORT
+# --------------------------------------------------
+
+def _fmt(value):
+    if value is None:
+        return "-"
+    return f"{value:.0f}" if abs(value) >= 1000 else f"{value:.2f}"
+
+
+def print_summary(summary, n_cases):
+    print(f"Meshed cases: {n_cases} ({summary['failed']} failed checkMesh)")
+    print(f"{'metric':<24}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    print("-" * 64)
+    for metric in QUALITY_METRICS:
+        s = summary[metric]
+        print(f"{metric:<24}{_fmt(s['p50']):>10}{_fmt(s['p90']):>10}{_fmt(s['p99']):>10}{_fmt(s['max']):>10}")
+
+
+def print_outliers(outliers, limit=None):
+    if not outliers:
+        print("No outliers.")
+        return
+    shown = outliers if limit is None else outliers[:limit]
+    print(f"{'case':<30}{'metric':<24}{'value':>10}  reason")
+    print("-" * 76)
+    for o in shown:
+        print(f"{o['case']:<30}{o['metric']:<24}{_fmt(o['value']):>10}  {o['reason']}")
+    if len(shown) < len(outliers):
+        print(f"... {len(outliers) - len(shown)} more")
@@ -0,0 +1,600 @@
+"""
+Command-line entry point for the OpenFOAM case pipeline.
+
+    python3 pipeline.py [--config FILE] [--json] <command> [options]
+
+Commands: generate, mesh, quality, submit, status, fetch, residuals, monitor, tune, storage,
+metrics.
+Settings come from a JSON config file (see pipeline_config.example.json);
+heavy modules are imported only by the commands that need them.
+"""
+import argparse
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+from pathlib import Path
+
+
+DEFAULT_CONFIG_FILE = "pipeline_config.json"
+
+DEFAULT_CONFIG = {
+    "template_path": str(Path(__file__).resolve().parent / "template"),
+    "input_dir": None,
+    "output_dir": None,
+    "deucalion_path": None,
+    "metrics_file": None,
+    "hpc": {},
+    "mesh": {
+        "n_cases": 4,
+        "n_workers": 4,
+        "auto_submit": True
+    },
+    "quality": {
+        "limits": {
+            "max_non_orthogonality": 70,
+            "max_skewness": 4,
+            "max_aspect_ratio": 1000
+        },
+        "z_threshold": 3.5
+    },
+    "submit": {
+        "queue_target": None,
+        "max_pending": None,
+        "order": ["terrain", "longest"]
+    },
+    "residuals": {
+        "n_workers": 4,
+        "max_points": 1000,
+        "plots": True,
+        "tolerances": {"p": 1e-4, "U": 1e-4, "k": 1e-5, "epsilon": 1e-5}
+    },
+    "monitor": {
+        "min_interval_minutes": 2,
+        "max_interval_minutes": 30,
+        "max_concurrent_remote": 4,
+        "max_resubmits": 2,
+        "auto_fetch": True,
+        "auto_submit": True,
+        "max_iterations": None
+    },
+    "tuning": {
+        "iterations": 150,
+        "n_procs": 4,
+        "size_tolerance": 2.0,
+        "work_dir": None,
+        "timeout_minutes": None,
+        "grid": None
+    },
+    "storage": {
+        "mesh_mode": "prune",
+        "compress_fields": True
+    }
+}
+
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+
+def load_config(path):
+    """Read the JSON config and fill in defaults (one level of nesting)."""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    path = Path(path)
+    if path.exists():
+        with open(path) as f:
+            user = json.load(f)
+        for key, value in user.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    elif path.name != DEFAULT_CONFIG_FILE:
+        sys.exit(f"Config file not found: {path}")
+
+    if not config["output_dir"]:
+        sys.exit(f"'output_dir' must be set in {path}")
+    return config
+
+
+def make_generator(config):
+    from taskManager import OpenFOAMCaseGenerator
+    generator = OpenFOAMCaseGenerator(
+        template_path=config["template_path"],
+        input_dir=config["input_dir"] or ".",
+        output_dir=config["output_dir"],
+        deucalion_path=config["deucalion_path"],
+        metrics_file=config["metrics_file"]
+    )
+    # Account, partition, ntasks, walltime, scratch staging, ... (see hpc_defaults)
+    generator.hpc_defaults.update(config["hpc"])
+    return generator
+
+
+def make_controller(config, generator):
+    from jobMonitor import SubmissionController
+    settings = config["submit"]
+    return SubmissionController(
+        generator,
+        queue_target=settings["queue_target"],
+        max_pending=settings["max_pending"],
+        order=settings["order"]
+    )
+
+
+def select_cases(generator, names):
+    cases = [generator.output_dir / name for name in names]
+    missing = [c.name for c in cases if not (c / "case_status.json").exists()]
+    if missing:
+        sys.exit(f"Unknown case(s): {', '.join(missing)}")
+    return cases
+
+
+# --------------------------------------------------
+# COMMANDS
+# --------------------------------------------------
+
+def cmd_generate(config, args):
+    if not config["input_dir"]:
+        sys.exit("'input_dir' must be set in the config to generate cases")
+    generator = make_generator(config)
+    cases = generator.find_cases()
+    print(f"Found {len(cases)} cases")
+
+    generated = []
+    for case_info in cases:
+        print(f"Processing terrain_{case_info['terrain_index']} @ {case_info['rotation_degree']}°")
+        output = generator.setup_case(case_info)
+        print(f"  → {output}")
+        generated.append(output.name)
+    return {"generated": generated}
+
+
+def submit_ready(config, generator, limit=None):
+    """Submit ready cases in priority order, up to the free queue slots (and limit)."""
+    controller = make_controller(config, generator)
+    counts = generator.get_queue_counts() if controller.needs_queue_counts() else None
+    ready = controller.select(generator.list_ready_cases(), counts)
+    if counts is not None:
+        print(f"Queue: {sum(counts.values())} of our jobs on the partition, submitting {len(ready)}")
+    if limit is not None:
+        ready = ready[:limit]
+
+    submitted = []
+    for case in ready:
+        generator.copy_and_submit(case)
+        status = generator.get_status(case)
+        if status.get("submitted"):
+            submitted.append({"case": case.name, "job_id": status.get("job_id")})
+        if generator.submit_limit_hit:
+            print("Submit limit reached; remaining cases stay ready")
+            break
+    return submitted
+
+
+def cmd_mesh(config, args):
+    generator = make_generator(config)
+    settings = config["mesh"]
+    n_cases = args.n if args.n is not None else settings["n_cases"]
+    n_workers = args.workers or settings["n_workers"]
+    auto_submit = settings["auto_submit"] if args.submit is None else args.submit
+
+    if args.cases:
+        cases_to_mesh = select_cases(generator, args.cases)
+    else:
+        cases_to_mesh = generator.list_cases_by_status(mesh_status="NOT_RUN")[:n_cases]
+
+    results = []
+    if not cases_to_mesh:
+        print("No cases need meshing.")
+    else:
+        print(f"Meshing {len(cases_to_mesh)} cases with {n_workers} workers...")
+        results = generator.mesh_cases_parallel(cases_to_mesh, n_workers=n_workers)
+
+    submitted = []
+    if auto_submit:
+        print("\n" + "="*60)
+        print("Auto-submission enabled")
+        print("="*60 + "\n")
+        submitted = submit_ready(config, generator)
+
+    return {
+        "meshed": [c.name for c, ok in zip(cases_to_mesh, results) if ok],
+        "failed": [c.name for c, ok in zip(cases_to_mesh, results) if not ok],
+        "submitted": submitted
+    }
+
+
+def cmd_quality(config, args):
+    import meshQuality
+
+    generator = make_generator(config)
+    settings = config["quality"]
+    if args.rebuild:
+        table = meshQuality.rebuild_table(generator, n_workers=config["mesh"]["n_workers"])
+        print(f"Re-parsed log.checkMesh of {len(table)} cases")
+    else:
+        table = meshQuality.load_table(generator.mesh_quality_file)
+
+    summary = meshQuality.summarize(table)
+    outliers = meshQuality.find_outliers(table, settings["limits"], settings["z_threshold"])
+    if not args.json:
+        meshQuality.print_summary(summary, len(table))
+        print()
+        meshQuality.print_outliers(outliers, limit=None if args.all else args.top)
+    return {"summary": summary, "outliers": outliers, **({"cases": table} if args.all else {})}
+
+
+def cmd_submit(config, args):
+    generator = make_generator(config)
+    if args.cases:
+        submitted = []
+        for case in select_cases(generator, args.cases):
+            generator.copy_and_submit(case)
+            status = generator.get_status(case)
+            if status.get("submitted"):
+                submitted.append({"case": case.name, "job_id": status.get("job_id")})
+    else:
+        submitted = submit_ready(config, generator, limit=args.limit)
+    return {"submitted": submitted}
+
+
+def collect_status(output_dir):
+    """Read every case_status.json under output_dir. Returns (per-case list, counts)."""
+    cases = []
+    with os.scandir(output_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            try:
+                with open(os.path.join(entry.path, "case_status.json")) as f:
+                    status = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            status["case"] = entry.name
+            cases.append(status)
+    cases.sort(key=lambda s: s["case"])
+
+    counts = {"total": len(cases), "mesh_status": {}, "job_status": {}, "results_fetched": 0}
+    for s in cases:
+        mesh = s.get("mesh_status") or "NONE"
+        counts["mesh_status"][mesh] = counts["mesh_status"].get(mesh, 0) + 1
+        if s.get("submitted"):
+            job = s.get("job_status") or "UNKNOWN"
+            counts["job_status"][job] = counts["job_status"].get(job, 0) + 1
+        if s.get("results_fetched"):
+            counts["results_fetched"] += 1
+    counts["ready"] = sum(1 for s in cases if s.get("mesh_status") == "DONE" and not s.get("submitted"))
+    return cases, counts
+
+
+def add_remote_progress(config, cases, max_age):
+    """Annotate submitted cases with remote progress from one inventory round-trip."""
+    import time
+    generator = make_generator(config)
+    submitted = [s for s in cases if s.get("submitted")]
+    inventory = generator.get_remote_inventory([s["case"] for s in submitted], max_age=max_age)
+
+    now = time.time()
+    for s in submitted:
+        entry = inventory.get(s["case"])
+        if not entry:
+            continue
+        # A running job only writes decomposed times, under processor0/
+        times = sorted(int(t) for t in {**entry["time_dirs"], **entry.get("processor_time_dirs", {})})
+        end_time = generator.get_last_timestep(generator.output_dir / s["case"])
+        log = entry["logs"].get("log.simpleFoam")
+        s["remote"] = {
+            "exists": entry["exists"],
+            "latest_time": times[-1] if times else None,
+            "end_time": end_time,
+            "progress": times[-1] / end_time if times and end_time else None,
+            "solver_log_bytes": log["size"] if log else None,
+            "solver_log_age_s": now - log["mtime"] if log else None,
+            "checked_at": entry["checked_at"]
+        }
+
+
+def cmd_status(config, args):
+    # Without --remote this deliberately avoids taskManager: a plain directory scan is all that's needed
+    cases, counts = collect_status(config["output_dir"])
+    if args.job_status:
+        cases = [s for s in cases if s.get("job_status") == args.job_status.upper()]
+    if args.mesh_status:
+        cases = [s for s in cases if s.get("mesh_status") == args.mesh_status.upper()]
+
+    listing = args.cases or args.job_status or args.mesh_status or args.remote
+    if args.remote:
+        with redirect_stdout(sys.stderr):
+            add_remote_progress(config, cases, args.max_age)
+    if args.json:
+        return {"counts": counts, "cases": cases} if listing else {"counts": counts}
+
+    print(f"Cases: {counts['total']}")
+    print("Mesh:   " + ", ".join(f"{k} {v}" for k, v in sorted(counts["mesh_status"].items())))
+    print(f"Ready for submission: {counts['ready']}")
+    if counts["job_status"]:
+        print("Jobs:   " + ", ".join(f"{k} {v}" for k, v in sorted(counts["job_status"].items())))
+    print(f"Results fetched: {counts['results_fetched']}")
+
+    if listing:
+        print()
+        for s in cases:
+            job = f"Job {s.get('job_id')} [{s.get('job_status')}]" if s.get("submitted") else ""
+            remote = s.get("remote")
+            if remote and remote["progress"] is not None:
+                job += f"  t={remote['latest_time']}/{remote['end_time']} ({remote['progress']:.0%})"
+            if remote and remote["solver_log_age_s"] is not None:
+                job += f"  log updated {remote['solver_log_age_s'] / 60:.0f} min ago"
+            print(f"  {s['case']:<30}{s.get('mesh_status', ''):<10}{job}")
+    return None
+
+
+def cmd_fetch(config, args):
+    generator = make_generator(config)
+    if args.cases:
+        cases = select_cases(generator, args.cases)
+    else:
+        cases = [
+            c for c in generator.list_cases_by_status(submitted=True)
+            if generator.get_status(c).get("job_status") == "COMPLETED"
+            and (args.refetch or not generator.get_status(c).get("results_fetched"))
+        ]
+
+    if not cases:
+        print("No completed cases to fetch.")
+        return {"fetched": [], "failed": []}
+
+    results = generator.fetch_multiple_results(cases)
+    return {
+        "fetched": [c.name for c, ok in zip(cases, results) if ok],
+        "failed": [c.name for c, ok in zip(cases, results) if not ok]
+    }
+
+
+def cmd_residuals(config, args):
+    import residualAnalysis
+
+    generator = make_generator(config)
+    settings = config["residuals"]
+    if args.cases:
+        cases = select_cases(generator, args.cases)
+    else:
+        cases = [
+            c for c in generator.list_cases_by_status(submitted=True)
+            if (args.all or generator.get_status(c).get("results_fetched")) and (c / "log.simpleFoam").exists()
+        ]
+
+    plots = settings["plots"] if args.plots is None else args.plots
+    print(f"Analyzing {len(cases)} solver logs with {args.workers or settings['n_workers']} workers...")
+    rows = residualAnalysis.analyze_cases(
+        cases,
+        n_workers=args.workers or settings["n_workers"],
+        tolerances=settings["tolerances"],
+        max_points=settings["max_points"],
+        plots=plots,
+        summary_dir=generator.output_dir
+    )
+    if not args.json:
+        residualAnalysis.print_table(rows)
+        if plots and rows:
+            print(f"Figures: <case>/{residualAnalysis.CASE_PLOT_NAME}, "
+                  f"{generator.output_dir / residualAnalysis.OVERLAY_PLOT_NAME}, "
+                  f"{generator.output_dir / residualAnalysis.SUMMARY_PLOT_NAME}")
+    return {"cases": rows}
+
+
+def cmd_monitor(config, args):
+    import asyncio
+    from jobMonitor import JobMonitor
+
+    generator = make_generator(config)
+    settings = config["monitor"]
+    monitor = JobMonitor(
+        generator,
+        controller=make_controller(config, generator),
+        min_interval=settings["min_interval_minutes"] * 60,
+        max_interval=settings["max_interval_minutes"] * 60,
+        max_concurrent=settings["max_concurrent_remote"],
+        max_resubmits=settings["max_resubmits"],
+        auto_fetch=settings["auto_fetch"],
+        auto_submit=settings["auto_submit"]
+    )
+
+    try:
+        asyncio.run(monitor.run(max_iterations=args.iterations or settings["max_iterations"]))
+    except KeyboardInterrupt:
+        print("\n\nMonitoring stopped by user (Ctrl+C).")
+    return {"iterations": monitor.iteration}
+
+
+def cmd_tune(config, args):
+    from solverTuning import load_table, print_table, run_tuning
+
+    generator = make_generator(config)
+    settings = config["tuning"]
+    generator.tuning_size_tolerance = settings["size_tolerance"]
+
+    if args.case:
+        case = select_cases(generator, [args.case])[0]
+        timeout = settings["timeout_minutes"] * 60 if settings["timeout_minutes"] else None
+        rows = run_tuning(
+            generator, case,
+            grid=settings["grid"],
+            n_iterations=args.iterations or settings["iterations"],
+            n_procs=args.procs or settings["n_procs"],
+            work_dir=settings["work_dir"],
+            timeout=timeout,
+            keep_trials=args.keep
+        )
+        if not args.json:
+            print()
+            print_table(rows)
+        result = {"trials": rows}
+    else:
+        result = {"trials": load_table(generator.tuning_file)}
+        if not args.json and not args.apply:
+            print_table(result["trials"])
+
+    if args.apply:
+        # Meshed cases that have not been copied yet still get the new settings
+        applied = {}
+        for case in generator.list_ready_cases():
+            if not generator.get_status(case).get("copied_to_hpc"):
+                settings_used = generator.apply_tuned_solver_settings(case)
+                if settings_used:
+                    applied[case.name] = settings_used
+        print(f"Tuned settings applied to {len(applied)} case(s)")
+        result["applied"] = applied
+    return result
+
+
+def cmd_storage(config, args):
+    import caseStorage
+
+    generator = make_generator(config)
+    cases = select_cases(generator, args.cases) if args.cases else None
+
+    if args.restore:
+        cases = cases or [c for c in generator.list_cases_by_status()
+                          if generator.get_status(c).get("storage")]
+        restored = [c.name for c in cases if caseStorage.restore_case(generator, c)]
+        return {"restored": restored, "failed": [c.name for c in cases if c.name not in restored]}
+
+    settings = config["storage"]
+    actions = caseStorage.plan(
+        generator, cases,
+        mesh_mode=args.mesh_mode or settings["mesh_mode"],
+        compress_fields=settings["compress_fields"]
+    )
+    if not args.json:
+        caseStorage.print_plan(actions)
+
+    result = {"summary": caseStorage.summarize_plan(actions), "actions": actions}
+    if args.apply and actions:
+        result["freed"] = caseStorage.apply_actions(generator, actions)
+        print(f"Freed {caseStorage.format_bytes(result['freed'])}")
+    return result
+
+
+def cmd_metrics(config, args):
+    from pipelineMetrics import summarize, print_summary
+
+    metrics_file = config["metrics_file"] or str(Path(config["output_dir"]) / "pipeline_metrics.jsonl")
+    if not Path(metrics_file).exists():
+        sys.exit(f"No metrics recorded yet: {metrics_file}")
+    summary = summarize(metrics_file)
+    if args.json:
+        return summary
+    print_summary(summary)
+    return None
+
+
+# --------------------------------------------------
+# ARGUMENT PARSING
+# --------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="OpenFOAM case pipeline")
+    parser.add_argument("--config", default=os.environ.get("OF_PIPELINE_CONFIG", DEFAULT_CONFIG_FILE),
+                        help=f"JSON config file (default: $OF_PIPELINE_CONFIG or {DEFAULT_CONFIG_FILE})")
+    parser.add_argument("--json", action="store_true",
+                        help="Print a machine-readable result on stdout (progress goes to stderr)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("generate", help="Create case folders from the template and input tree")
+
+    p = sub.add_parser("mesh", help="Mesh NOT_RUN cases in parallel (and submit them)")
+    p.add_argument("cases", nargs="*", help="Case names (default: next n NOT_RUN cases)")
+    p.add_argument("-n", type=int, help="Number of cases to mesh")
+    p.add_argument("--workers", type=int, help="Parallel meshing workers")
+    p.add_argument("--submit", dest="submit", action="store_true", default=None)
+    p.add_argument("--no-submit", dest="submit", action="store_false")
+
+    p = sub.add_parser("quality", help="checkMesh figures over the dataset and outlier cases")
+    p.add_argument("--rebuild", action="store_true", help="Re-parse every log.checkMesh into the table")
+    p.add_argument("--top", type=int, default=20, help="Show the N worst outliers (default 20)")
+    p.add_argument("--all", action="store_true", help="Show every outlier (--json: include every case)")
+
+    p = sub.add_parser("submit", help="Copy and submit meshed cases")
+    p.add_argument("cases", nargs="*",
+                   help="Case names (default: ready cases by priority, up to the queue target)")
+    p.add_argument("--limit", type=int, help="Submit at most this many ready cases")
+
+    p = sub.add_parser("status", help="Summarize case and job status (local files only)")
+    p.add_argument("--cases", action="store_true", help="List every case")
+    p.add_argument("--job-status", help="Only cases with this job status")
+    p.add_argument("--mesh-status", help="Only cases with this mesh status")
+    p.add_argument("--remote", action="store_true",
+                   help="Add remote progress (latest time, solver log age) from one SSH call")
+    p.add_argument("--max-age", type=float, default=300,
+                   help="Reuse cached remote listings younger than this many seconds (default 300)")
+
+    p = sub.add_parser("fetch", help="Fetch results of completed jobs")
+    p.add_argument("cases", nargs="*", help="Case names (default: completed, not yet fetched)")
+    p.add_argument("--refetch", action="store_true", help="Include cases already fetched")
+
+    p = sub.add_parser("residuals", help="Residual table and plots from fetched solver logs")
+    p.add_argument("cases", nargs="*", help="Case names (default: cases with fetched results)")
+    p.add_argument("--all", action="store_true", help="Include submitted cases not fetched yet (partial logs)")
+    p.add_argument("--workers", type=int, help="Parallel parsing/plotting processes")
+    p.add_argument("--plots", dest="plots", action="store_true", default=None)
+    p.add_argument("--no-plots", dest="plots", action="store_false")
+
+    p = sub.add_parser("monitor", help="Run the job monitor")
+    p.add_argument("--iterations", type=int, help="Stop after this many polls")
+
+    p = sub.add_parser("tune", help="Trial-run solver settings on a meshed case, or show/apply results "
+                                    "(the fvSchemes switch time itself is not tuned)")
+    p.add_argument("case", nargs="?", help="Meshed case to run the trials on (omit to show the table)")
+    p.add_argument("--iterations", type=int, help="Iterations per trial")
+    p.add_argument("--procs", type=int, help="MPI ranks per trial")
+    p.add_argument("--keep", action="store_true", help="Keep trial case directories")
+    p.add_argument("--apply", action="store_true",
+                   help="Re-render fvSolution of meshed, not yet copied cases with the best settings")
+
+    p = sub.add_parser("storage", help="Report, prune/compress or restore local mesh and field data")
+    p.add_argument("cases", nargs="*", help="Case names (default: every case)")
+    p.add_argument("--apply", action="store_true",
+                   help="Prune/compress data of uploaded and fetched cases (default: report only)")
+    p.add_argument("--mesh-mode", choices=["prune", "compress", "keep"],
+                   help="What to do with constant/polyMesh of uploaded cases")
+    p.add_argument("--restore", action="store_true",
+                   help="Unpack archives and regenerate pruned meshes (blockMesh)")
+
+    sub.add_parser("metrics", help="Summarize pipeline stage timings")
+
+    return parser
+
+
+COMMANDS = {
+    "generate": cmd_generate,
+    "mesh": cmd_mesh,
+    "quality": cmd_quality,
+    "submit": cmd_submit,
+    "status": cmd_status,
+    "fetch": cmd_fetch,
+    "residuals": cmd_residuals,
+    "monitor": cmd_monitor,
+    "tune": cmd_tune,
+    "storage": cmd_storage,
+    "metrics": cmd_metrics,
+}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = load_config(args.config)
+    command = COMMANDS[args.command]
+
+    if args.json:
+        with redirect_stdout(sys.stderr):
+            result = command(config, args)
+        json.dump(result, sys.stdout, indent=2, default=str)
+        print()
+    else:
+        command(config, args)
+
+
+if __name__ == "__main__":
+    main()
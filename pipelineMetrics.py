@@ -0,0 +1,367 @@
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+STAGE_ORDER = ["generate", "mesh", "upload", "submit", "queue", "solve", "fetch"]
+
+RSYNC_BYTES_PATTERN = re.compile(r'sent ([\d,\.]+) bytes\s+received ([\d,\.]+) bytes')
+TIME_PATTERN = re.compile(r'^Time = (\d+)', re.MULTILINE)
+EXECUTION_TIME_PATTERN = re.compile(r'ExecutionTime = ([\d\.e\+-]+) s\s+ClockTime = ([\d\.e\+-]+) s')
+CELLS_PATTERN = re.compile(r'^\s*cells:\s+(\d+)', re.MULTILINE)
+NON_ORTHO_PATTERN = re.compile(r'Mesh non-orthogonality Max: ([\d\.e\+-]+) average: ([\d\.e\+-]+)')
+SKEWNESS_PATTERN = re.compile(r'Max skewness = ([\d\.e\+-]+)')
+# "Max aspect ratio = 12.3 OK." or "***High aspect ratio cells found, Max aspect ratio: 1.2e+03, ..."
+ASPECT_RATIO_PATTERN = re.compile(r'Max aspect ratio(?: =|:) ([\d\.e\+-]+?)[,\s]')
+FAILED_CHECKS_PATTERN = re.compile(r'Failed (\d+) mesh checks')
+RESIDUAL_PATTERN = re.compile(r'Solving for (\w+), Initial residual = ([^,]+), Final residual = ([^,]+)')
+CLOCK_TIME_PATTERN = re.compile(r'ClockTime = ([\d\.e\+-]+) s')
+
+
+# --------------------------------------------------
+# RECORDING
+# --------------------------------------------------
+
+class MetricsRecorder:
+    """
+    Appends one JSON object per line to a metrics file.
+
+    Every line is written with a single O_APPEND write, so parallel
+    meshing workers and monitor threads can share the same file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def record(self, case, stage, event, **fields):
+        append_jsonl(self.path, {
+            "ts": datetime.now().isoformat(),
+            "case": Path(case).name,
+            "stage": stage,
+            "event": event,
+            **fields
+        })
+
+    @contextmanager
+    def stage(self, case, stage, **fields):
+        """
+        Record start/end events around a pipeline stage.
+
+        The yielded dict can be filled with extra fields (bytes, cells, ...)
+        and sets "ok" to False to mark a failure without raising.
+        """
+        self.record(case, stage, "start", **fields)
+        extra = {"ok": True}
+        start = time.perf_counter()
+        try:
+            yield extra
+        except BaseException:
+            extra["ok"] = False
+            raise
+        finally:
+            self.record(case, stage, "end", duration=time.perf_counter() - start, **fields, **extra)
+
+
+def append_jsonl(path, entry):
+    """Append one JSON line with a single O_APPEND write (safe across processes)."""
+    line = json.dumps(entry) + "\n"
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+    finally:
+        os.close(fd)
+
+
+class NullRecorder:
+    """Drop-in recorder that discards everything (metrics disabled)."""
+
+    def record(self, case, stage, event, **fields):
+        pass
+
+    @contextmanager
+    def stage(self, case, stage, **fields):
+        yield {"ok": True}
+
+
+# --------------------------------------------------
+# LOG PARSING
+# --------------------------------------------------
+
+def parse_rsync_bytes(output):
+    """Return (bytes_sent, bytes_received) from rsync's closing summary line, or (None, None)."""
+    match = RSYNC_BYTES_PATTERN.search(output or "")
+    if not match:
+        return None, None
+    sent, received = (float(g.replace(",", "")) for g in match.groups())
+    return int(sent), int(received)
+
+
+def parse_cell_count(log_path):
+    """Cell count from a log.checkMesh, or None."""
+    log_path = Path(log_path)
+    if not log_path.exists():
+        return None
+    match = CELLS_PATTERN.search(log_path.read_text(errors="replace"))
+    return int(match.group(1)) if match else None
+
+
+def parse_check_mesh(log_path):
+    """
+    Size and quality figures from a log.checkMesh.
+
+    Returns a dict with cells, max_non_orthogonality, avg_non_orthogonality,
+    max_skewness, max_aspect_ratio (None where not reported), mesh_ok and
+    failed_checks, or None if the log is missing. If the log covers several
+    times, the last one counts.
+    """
+    log_path = Path(log_path)
+    if not log_path.exists():
+        return None
+    content = log_path.read_text(errors="replace")
+
+    def last(pattern, group=1):
+        matches = list(pattern.finditer(content))
+        return float(matches[-1].group(group)) if matches else None
+
+    cells = last(CELLS_PATTERN)
+    failed = FAILED_CHECKS_PATTERN.findall(content)
+    return {
+        "cells": int(cells) if cells is not None else None,
+        "max_non_orthogonality": last(NON_ORTHO_PATTERN, 1),
+        "avg_non_orthogonality": last(NON_ORTHO_PATTERN, 2),
+        "max_skewness": last(SKEWNESS_PATTERN),
+        "max_aspect_ratio": last(ASPECT_RATIO_PATTERN),
+        "mesh_ok": "Mesh OK" in content,
+        "failed_checks": int(failed[-1]) if failed else 0
+    }
+
+
+def parse_solver_log(log_path):
+    """
+    Iteration count and speed from a log.simpleFoam.
+
+    Returns a dict with iterations, last_time, execution_time, clock_time,
+    iterations_per_second and converged (residualControl reached before
+    endTime), or None if the log is missing/empty.
+    """
+    log_path = Path(log_path)
+    if not log_path.exists():
+        return None
+    content = log_path.read_text(errors="replace")
+
+    times = TIME_PATTERN.findall(content)
+    if not times:
+        return None
+
+    execution_time = clock_time = None
+    # Only the last ExecutionTime line matters; search from the end
+    tail = content[-4096:]
+    matches = EXECUTION_TIME_PATTERN.findall(tail) or EXECUTION_TIME_PATTERN.findall(content)
+    if matches:
+        execution_time, clock_time = (float(v) for v in matches[-1])
+
+    iterations = len(times)
+    return {
+        "iterations": iterations,
+        "last_time": int(times[-1]),
+        "execution_time": execution_time,
+        "clock_time": clock_time,
+        "iterations_per_second": iterations / clock_time if clock_time else None,
+        "converged": "solution converged in" in tail
+    }
+
+
+def parse_residuals(log_path):
+    """
+    Per-iteration residual history of a log.simpleFoam.
+
+    Returns {"time": [...], "clock": [...], "initial": {field: [...]},
+    "final": {field: [...]}, "fatal": bool} where "initial" is the first
+    initial residual of each field in an iteration and "final" the last
+    final residual (p is solved once per non-orthogonal corrector).
+    Missing values are None. Returns None if the log does not exist.
+    """
+    log_path = Path(log_path)
+    if not log_path.exists():
+        return None
+
+    history = {"time": [], "clock": [], "initial": {}, "final": {}, "fatal": False}
+    initial, final = history["initial"], history["final"]
+    seen = set()
+    idx = -1
+
+    with open(log_path, errors="replace") as f:
+        for line in f:
+            if line.startswith("Time = "):
+                try:
+                    t = int(line[7:].strip())
+                except ValueError:
+                    continue
+                idx += 1
+                history["time"].append(t)
+                history["clock"].append(None)
+                for series in (*initial.values(), *final.values()):
+                    series.append(None)
+                seen.clear()
+            elif "Solving for" in line and idx >= 0:
+                match = RESIDUAL_PATTERN.search(line)
+                if not match:
+                    continue
+                try:
+                    initial_value, final_value = float(match.group(2)), float(match.group(3))
+                except ValueError:
+                    # Truncated last line of a killed or still running solver
+                    continue
+                field = match.group(1)
+                if field not in initial:
+                    initial[field] = [None] * (idx + 1)
+                    final[field] = [None] * (idx + 1)
+                if field not in seen:
+                    initial[field][idx] = initial_value
+                    seen.add(field)
+                final[field][idx] = final_value
+            elif line.startswith("ExecutionTime") and idx >= 0:
+                match = CLOCK_TIME_PATTERN.search(line)
+                if match:
+                    try:
+                        history["clock"][idx] = float(match.group(1))
+                    except ValueError:
+                        continue
+            elif "FOAM FATAL" in line:
+                history["fatal"] = True
+
+    return history
+
+
+# --------------------------------------------------
+# SUMMARY
+# --------------------------------------------------
+
+def load_events(path):
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A partially written last line from a killed process
+                continue
+    return events
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0-100) of a list of numbers."""
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(path):
+    """
+    Aggregate a metrics file into per-stage statistics.
+
+    For each stage: count, failures, duration mean/p50/p90/p99/max,
+    total bytes, cases/hour over the wall-clock span of the stage and
+    cases/hour per busy worker (count / summed duration).
+    """
+    events = load_events(path)
+    by_stage = {}
+
+    for e in events:
+        if e.get("event") not in ("end", "log"):
+            continue
+        s = by_stage.setdefault(e["stage"], {
+            "durations": [], "failed": 0, "bytes": 0, "first": None, "last": None,
+            "ips": [], "cells": []
+        })
+        if e["event"] == "log":
+            # Per-case log statistics (e.g. solver speed) carry no duration
+            if e.get("iterations_per_second"):
+                s["ips"].append(e["iterations_per_second"])
+            continue
+
+        # Stages timed by the scheduler (queue, solve) carry their real end time
+        ts = datetime.fromisoformat(e.get("end_ts") or e["ts"])
+        duration = e.get("duration") or 0
+        start = ts.timestamp() - duration
+        s["first"] = start if s["first"] is None else min(s["first"], start)
+        s["last"] = ts.timestamp() if s["last"] is None else max(s["last"], ts.timestamp())
+
+        if not e.get("ok", True):
+            s["failed"] += 1
+            continue
+        s["durations"].append(duration)
+        s["bytes"] += (e.get("bytes_sent") or 0) + (e.get("bytes_received") or 0)
+        if e.get("cells"):
+            s["cells"].append(e["cells"])
+
+    summary = {}
+    for stage, s in by_stage.items():
+        d = s["durations"]
+        span = (s["last"] - s["first"]) if s["first"] is not None else 0
+        busy = sum(d)
+        summary[stage] = {
+            "count": len(d),
+            "failed": s["failed"],
+            "mean": busy / len(d) if d else None,
+            "p50": percentile(d, 50),
+            "p90": percentile(d, 90),
+            "p99": percentile(d, 99),
+            "max": max(d) if d else None,
+            "bytes": s["bytes"],
+            "cases_per_hour": len(d) / span * 3600 if span > 0 else None,
+            "cases_per_worker_hour": len(d) / busy * 3600 if busy > 0 else None,
+            "iterations_per_second_p50": percentile(s["ips"], 50),
+            "cells_p50": percentile(s["cells"], 50)
+        }
+    return summary
+
+
+def _fmt_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 120:
+        return f"{seconds:.1f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.2f}h"
+
+
+def _fmt_rate(rate):
+    return "-" if rate is None else f"{rate:.1f}"
+
+
+def print_summary(summary):
+    stages = [s for s in STAGE_ORDER if s in summary] + sorted(set(summary) - set(STAGE_ORDER))
+
+    print(f"{'stage':<10}{'n':>7}{'fail':>6}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+          f"{'MB':>10}{'cases/h':>10}{'per-worker/h':>14}")
+    print("-" * 102)
+    for stage in stages:
+        s = summary[stage]
+        print(f"{stage:<10}{s['count']:>7}{s['failed']:>6}"
+              f"{_fmt_seconds(s['mean']):>9}{_fmt_seconds(s['p50']):>9}{_fmt_seconds(s['p90']):>9}"
+              f"{_fmt_seconds(s['p99']):>9}{_fmt_seconds(s['max']):>9}"
+              f"{s['bytes'] / 1e6:>10.1f}{_fmt_rate(s['cases_per_hour']):>10}"
+              f"{_fmt_rate(s['cases_per_worker_hour']):>14}")
+
+    if "solve" in summary and summary["solve"]["iterations_per_second_p50"]:
+        print(f"\nSolver speed (p50): {summary['solve']['iterations_per_second_p50']:.2f} iterations/s")
+    if "mesh" in summary and summary["mesh"]["cells_p50"]:
+        print(f"Mesh size (p50): {summary['mesh']['cells_p50']:.0f} cells")
+
+    rated = {k: v["cases_per_hour"] for k, v in summary.items() if v["cases_per_hour"]}
+    if rated:
+        bottleneck = min(rated, key=rated.get)
+        print(f"\nBottleneck: {bottleneck} ({rated[bottleneck]:.1f} cases/hour)")
@@ -0,0 +1,256 @@
+import math
+from multiprocessing import Pool
+from pathlib import Path
+
+from pipelineMetrics import parse_residuals
+
+
+# Convergence criteria per field (the commented-out residualControl in fvSolution.j2);
+# Ux/Uy/Uz use the "U" entry
+DEFAULT_TOLERANCES = {"p": 1e-4, "U": 1e-4, "k": 1e-5, "epsilon": 1e-5, "omega": 1e-5}
+
+CASE_PLOT_NAME = "Residuals_plot.png"
+OVERLAY_PLOT_NAME = "residuals_overlay.png"
+SUMMARY_PLOT_NAME = "residuals_summary.png"
+
+
+def tolerance_for(field, tolerances):
+    if field in tolerances:
+        return tolerances[field]
+    if field[:-1] in tolerances and field[-1] in "xyz":
+        return tolerances[field[:-1]]
+    return None
+
+
+# --------------------------------------------------
+# ANALYSIS (process pool workers)
+# --------------------------------------------------
+
+def downsample(times, values, max_points):
+    """
+    Reduce a series to at most ~max_points points, keeping the min and max
+    of each bucket so spikes and the residual envelope survive.
+    """
+    points = [(t, v) for t, v in zip(times, values) if v is not None and v > 0]
+    if len(points) <= max_points:
+        return [p[0] for p in points], [p[1] for p in points]
+
+    n_buckets = max(1, max_points // 2)
+    size = len(points) / n_buckets
+    kept = []
+    for b in range(n_buckets):
+        chunk = points[int(b * size):int((b + 1) * size)]
+        if chunk:
+            lo = min(chunk, key=lambda p: p[1])
+            hi = max(chunk, key=lambda p: p[1])
+            kept.extend(sorted({lo, hi}))
+    return [p[0] for p in kept], [p[1] for p in kept]
+
+
+def converged_at(times, initial, tolerances):
+    """
+    First time from which the initial residual of every field with a
+    tolerance stays below it until the end of the run, or None. Trailing
+    iterations with a missing value (a truncated log) are not counted as
+    converged.
+    """
+    checked = [(s, tolerance_for(f, tolerances)) for f, s in initial.items()]
+    checked = [(s, tol) for s, tol in checked if tol is not None]
+    if not checked:
+        return None
+
+    # Last iteration that has a value for every checked field
+    end = len(times) - 1
+    while end >= 0 and any(s[end] is None for s, _ in checked):
+        end -= 1
+
+    last_above = -1
+    for series, tol in checked:
+        for i in range(end, -1, -1):
+            v = series[i]
+            if v is not None and not (v < tol):
+                last_above = max(last_above, i)
+                break
+    if end < 0 or last_above >= end:
+        return None
+    return times[last_above + 1]
+
+
+def _last(series):
+    for v in reversed(series):
+        if v is not None:
+            return v
+    return None
+
+
+def analyze_case(case_path, tolerances=None, max_points=1000):
+    """
+    Parse a case's log.simpleFoam into its summary row plus the downsampled
+    initial-residual series for plotting. Returns None without a log.
+    """
+    case_path = Path(case_path)
+    tolerances = DEFAULT_TOLERANCES if tolerances is None else tolerances
+    history = parse_residuals(case_path / "log.simpleFoam")
+    if not history or not history["time"]:
+        return None
+
+    times = history["time"]
+    return {
+        "case": case_path.name,
+        "iterations": len(times),
+        "last_time": times[-1],
+        "converged_at": converged_at(times, history["initial"], tolerances),
+        "initial_residual": {f: _last(s) for f, s in history["initial"].items()},
+        "final_residual": {f: _last(s) for f, s in history["final"].items()},
+        "fatal": history["fatal"],
+        "series": {f: downsample(times, s, max_points) for f, s in history["initial"].items()}
+    }
+
+
+def _analyze(args):
+    return analyze_case(*args)
+
+
+# --------------------------------------------------
+# PLOTTING (process pool workers)
+# --------------------------------------------------
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_case_plot(result, output_path):
+    """Initial residuals of one case vs iteration (log scale)."""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, 8))
+    for field, (t, v) in sorted(result["series"].items()):
+        if t:
+            ax.plot(t, v, label=field, linewidth=1)
+    if result["converged_at"] is not None:
+        ax.axvline(result["converged_at"], color="k", ls=":", label="converged")
+
+    ax.set_title(f"{result['case']}: initial residuals", fontsize=16)
+    ax.set_xlabel("Time (Iteration)", fontsize=12)
+    ax.set_ylabel("Initial residual", fontsize=12)
+    ax.set_yscale("log")
+    ax.grid(True, which="both", ls="--", alpha=0.5)
+    ax.legend()
+    fig.savefig(output_path, dpi=100)
+    plt.close(fig)
+    return str(output_path)
+
+
+def render_overlay_plot(results, output_path):
+    """One panel per field with every case's initial residual overlaid."""
+    plt = _pyplot()
+    from matplotlib.collections import LineCollection
+
+    # Fields without a single plottable point (e.g. an all-zero Uz residual) get no panel
+    lines_by_field = {}
+    for field in sorted({f for r in results for f in r["series"]}):
+        lines = [list(zip(*r["series"][field])) for r in results if r["series"].get(field, ([], []))[0]]
+        if lines:
+            lines_by_field[field] = lines
+    fields = list(lines_by_field)
+
+    n_cols = min(3, len(fields)) or 1
+    n_rows = math.ceil(len(fields) / n_cols) or 1
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(6 * n_cols, 4 * n_rows), squeeze=False)
+
+    for ax, field in zip(axes.flat, fields):
+        lines = lines_by_field[field]
+        # One collection per panel: thousands of cases still draw quickly
+        ax.add_collection(LineCollection(lines, linewidths=0.5, alpha=max(0.02, min(0.5, 20 / len(lines)))))
+        ax.set_yscale("log")
+        ax.autoscale()
+        ax.set_title(f"{field} ({len(lines)} cases)")
+        ax.set_xlabel("Time (Iteration)")
+        ax.grid(True, which="both", ls="--", alpha=0.5)
+    for ax in list(axes.flat)[len(fields):]:
+        ax.set_visible(False)
+
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=100)
+    plt.close(fig)
+    return str(output_path)
+
+
+def render_summary_plot(results, output_path):
+    """Histograms of iterations-to-convergence and of the last initial residual of p."""
+    plt = _pyplot()
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4.5))
+
+    converged = [r["converged_at"] for r in results if r["converged_at"] is not None]
+    ax1.hist(converged, bins=30)
+    ax1.set_title(f"Iterations to convergence ({len(converged)}/{len(results)} converged)")
+    ax1.set_xlabel("Time (Iteration)")
+
+    p_final = [r["initial_residual"]["p"] for r in results if (r["initial_residual"].get("p") or 0) > 0]
+    if p_final:
+        lo, hi = math.log10(min(p_final)), math.log10(max(p_final))
+        bins = [10 ** (lo + (hi - lo) * i / 30) for i in range(31)] if hi > lo else 10
+        ax2.hist(p_final, bins=bins)
+        ax2.set_xscale("log")
+    ax2.set_title("Last initial residual of p")
+
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=100)
+    plt.close(fig)
+    return str(output_path)
+
+
+# --------------------------------------------------
+# BATCH
+# --------------------------------------------------
+
+def analyze_cases(case_paths, n_workers=4, tolerances=None, max_points=1000, plots=True, summary_dir=None):
+    """
+    Parse the solver logs of many cases in a process pool and, with plots,
+    render per-case figures (into each case) and overlay/summary figures
+    (into summary_dir) in the same pool. Returns the rows, in input order,
+    without the series; cases without a log are skipped.
+    """
+    case_paths = [Path(c) for c in case_paths]
+    with Pool(processes=n_workers) as pool:
+        results = pool.map(_analyze, [(c, tolerances, max_points) for c in case_paths], chunksize=4)
+        pairs = [(c, r) for c, r in zip(case_paths, results) if r]
+
+        if plots and pairs:
+            jobs = [pool.apply_async(render_case_plot, (r, c / CASE_PLOT_NAME)) for c, r in pairs]
+            if summary_dir is not None:
+                analyzed = [r for _, r in pairs]
+                jobs.append(pool.apply_async(render_overlay_plot, (analyzed, Path(summary_dir) / OVERLAY_PLOT_NAME)))
+                jobs.append(pool.apply_async(render_summary_plot, (analyzed, Path(summary_dir) / SUMMARY_PLOT_NAME)))
+            for job in jobs:
+                job.get()
+
+    rows = []
+    for _, r in pairs:
+        row = dict(r)
+        del row["series"]
+        rows.append(row)
+    return rows
+
+
+def print_table(rows):
+    if not rows:
+        print("No solver logs found.")
+        return
+    fields = [f for f in ("p", "Ux", "Uy", "Uz", "k", "epsilon", "omega")
+              if any(f in r["initial_residual"] for r in rows)]
+
+    def fmt(v):
+        return "-" if v is None else f"{v:.1e}"
+
+    print(f"{'case':<30}{'iters':>7}{'converged':>11}" + "".join(f"{f:>10}" for f in fields))
+    print("-" * (48 + 10 * len(fields)))
+    for r in rows:
+        conv = str(r["converged_at"]) if r["converged_at"] is not None else ("FATAL" if r["fatal"] else "no")
+        print(f"{r['case']:<30}{r['iterations']:>7}{conv:>11}"
+              + "".join(f"{fmt(r['initial_residual'].get(f)):>10}" for f in fields))
+
+    n_conv = sum(1 for r in rows if r["converged_at"] is not None)
+    print(f"\n{n_conv}/{len(rows)} converged (last initial residuals shown)")
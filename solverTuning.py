@@ -0,0 +1,288 @@
+import itertools
+import json
+import math
+import os
+import signal
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from shutil import copytree, ignore_patterns, rmtree
+
+from pipelineMetrics import parse_residuals
+
+
+# Values currently hard-coded in template/system/fvSolution.j2 (the j2 defaults)
+BASELINE_SETTINGS = {
+    "p_smoother": "DICGaussSeidel",
+    "p_n_pre_sweeps": 1,
+    "p_n_post_sweeps": 2,
+    "p_n_cells_coarsest": 50,
+    "p_merge_levels": 1,
+    "p_max_iter": 60,
+    "p_rel_tol": 0.01,
+    "relax_p": 0.4,
+    "relax_U": 0.6,
+    "relax_turb": 0.6
+}
+
+# Each key is varied over its list; everything else stays at the baseline
+DEFAULT_GRID = {
+    "p_smoother": ["DICGaussSeidel", "GaussSeidel"],
+    "p_n_cells_coarsest": [50, 500],
+    "p_merge_levels": [1, 2],
+    "relax_p": [0.3, 0.4]
+}
+
+
+# --------------------------------------------------
+# VARIANTS
+# --------------------------------------------------
+
+def expand_grid(grid=None):
+    """All combinations of the grid on top of the baseline, baseline first, without duplicates."""
+    grid = grid or DEFAULT_GRID
+    unknown = set(grid) - set(BASELINE_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown solver setting(s) in grid: {', '.join(sorted(unknown))}")
+
+    variants = [dict(BASELINE_SETTINGS)]
+    keys = sorted(grid)
+    for values in itertools.product(*(grid[k] for k in keys)):
+        variant = {**BASELINE_SETTINGS, **dict(zip(keys, values))}
+        if variant not in variants:
+            variants.append(variant)
+    return variants
+
+
+def variant_key(variant):
+    return json.dumps(variant, sort_keys=True)
+
+
+# --------------------------------------------------
+# TRIAL RUNS
+# --------------------------------------------------
+
+def score_trial(history, n_iterations):
+    """
+    Wall time per iteration and residual drop of a trial run.
+
+    residual_drop is the mean over fields of log10(first initial residual /
+    mean initial residual over the last 10% of iterations); score is that
+    drop per second of wall time, so cheaper iterations and faster
+    convergence both count.
+    """
+    times = history["time"] if history else []
+    result = {"iterations": len(times), "seconds_per_iteration": None,
+              "residual_drop": {}, "mean_drop": None, "score": None, "ok": False}
+    if len(times) < 10:
+        return result
+
+    # Skip the first iteration: it includes reading the mesh and agglomeration
+    clocks = [(i, c) for i, c in enumerate(history["clock"]) if c is not None]
+    if len(clocks) >= 2:
+        (i0, c0), (i1, c1) = clocks[0], clocks[-1]
+        if i1 > i0 and c1 > c0:
+            result["seconds_per_iteration"] = (c1 - c0) / (i1 - i0)
+
+    tail = max(1, len(times) // 10)
+    drops = {}
+    for field, series in history["initial"].items():
+        values = [v for v in series if v is not None]
+        last = [v for v in series[-tail:] if v is not None]
+        if not values or not last:
+            continue
+        end = sum(last) / len(last)
+        if not all(math.isfinite(v) for v in last) or values[0] <= 0 or end <= 0:
+            drops[field] = float("-inf")
+            continue
+        drops[field] = math.log10(values[0] / end)
+    result["residual_drop"] = drops
+
+    if drops:
+        result["mean_drop"] = sum(drops.values()) / len(drops)
+
+    result["ok"] = (
+        not history["fatal"]
+        and len(times) >= n_iterations
+        and result["mean_drop"] is not None and math.isfinite(result["mean_drop"])
+        and drops.get("p", 0) > -0.5  # pressure residual not growing
+    )
+    if result["ok"] and result["seconds_per_iteration"]:
+        result["score"] = result["mean_drop"] / (result["seconds_per_iteration"] * len(times))
+    return result
+
+
+def run_trial(generator, case_path, variant, trial_dir, n_iterations=150, n_procs=4, timeout=None):
+    """
+    Copy a meshed case to trial_dir, render fvSolution with the variant and a
+    short controlDict, run decomposePar + simpleFoam (Allrun RUN_STAGE=trial)
+    and score the log.
+
+    The fvSchemes_1 -> fvSchemes_2 switch is scaled to the same fraction of
+    the trial as of a production run, so the variant is scored on both.
+    """
+    case_path = Path(case_path)
+    trial_dir = Path(trial_dir)
+    if not (case_path / "constant" / "polyMesh").is_dir():
+        raise ValueError(f"{case_path.name} has no constant/polyMesh (pruned or compressed by storage?); "
+                         f"run 'pipeline.py storage --restore {case_path.name}' first")
+    copytree(case_path, trial_dir, dirs_exist_ok=True, ignore=ignore_patterns(
+        'processor*', 'postProcessing', 'case_status.json', 'log.simpleFoam', 'log.decomposePar',
+        'log.reconstructPar*', '*.png'
+    ))
+
+    generator.rerender_from_template(trial_dir, "system/fvSolution", **variant)
+    run = generator.run_defaults
+    switch_time = max(1, round(n_iterations * run["scheme_switch_time"] / run["end_time"]))
+    # Never reach a write time: writing fields isn't part of what we measure
+    generator.rerender_from_template(trial_dir, "system/controlDict", end_time=n_iterations,
+                                     write_interval=n_iterations * 10, scheme_switch_time=switch_time)
+    generator.rerender_from_template(trial_dir, "system/decomposeParDict", n_procs=n_procs)
+
+    env = os.environ.copy()
+    env["RUN_STAGE"] = "trial"
+    # Own process group: on timeout mpirun and the solver ranks must go too,
+    # or they keep the cores busy during the next trial
+    proc = subprocess.Popen(["bash", "Allrun"], cwd=trial_dir, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if proc.wait(timeout=timeout) != 0:
+            print(f"    ✗ trial failed: Allrun exited with {proc.returncode}")
+    except subprocess.TimeoutExpired:
+        print("    ✗ trial failed: timed out")
+        _kill_group(proc)
+
+    return score_trial(parse_residuals(trial_dir / "log.simpleFoam"), n_iterations)
+
+
+def _kill_group(proc, grace=10):
+    """SIGTERM the process group of proc, then SIGKILL whatever is left after grace seconds."""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=grace)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        pass
+    # The ranks may outlive bash: kill the whole group, not just proc
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    proc.wait()
+
+
+def run_tuning(generator, case_path, grid=None, n_iterations=150, n_procs=4,
+               work_dir=None, table_file=None, timeout=None, keep_trials=False):
+    """
+    Run one trial per grid variant on a meshed case and append the results
+    to the tuning table. Returns the new rows, best first.
+    """
+    case_path = Path(case_path)
+    table_file = Path(table_file or generator.tuning_file)
+    cells = generator.get_cell_count(case_path)
+    if not cells:
+        raise ValueError(f"{case_path.name} has no cell count in log.checkMesh; mesh it first")
+
+    variants = expand_grid(grid)
+    work_dir = Path(work_dir) if work_dir else Path(tempfile.mkdtemp(prefix="of_tune_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"[TUNE START] {case_path.name}: {cells} cells, {len(variants)} variants, "
+          f"{n_iterations} iterations on {n_procs} procs")
+
+    rows = []
+    for i, variant in enumerate(variants, 1):
+        changed = {k: v for k, v in variant.items() if v != BASELINE_SETTINGS[k]} or "baseline"
+        print(f"  [{i}/{len(variants)}] {changed}")
+        trial_dir = work_dir / f"{case_path.name}_trial{i:02d}"
+
+        result = run_trial(generator, case_path, variant, trial_dir, n_iterations, n_procs, timeout)
+        row = {
+            "case": case_path.name,
+            "cells": cells,
+            "n_procs": n_procs,
+            "settings": variant,
+            "timestamp": datetime.now().isoformat(),
+            **result
+        }
+        rows.append(row)
+        append_rows(table_file, [row])
+
+        if result["ok"]:
+            print(f"    ✓ {result['seconds_per_iteration']:.3f} s/it, "
+                  f"residual drop {result['mean_drop']:.2f} decades, score {result['score']:.4f}")
+        else:
+            print(f"    ✗ diverged or incomplete ({result['iterations']} iterations)")
+
+        if not keep_trials:
+            rmtree(trial_dir, ignore_errors=True)
+
+    if not keep_trials and not any(work_dir.iterdir()):
+        work_dir.rmdir()
+
+    rows.sort(key=lambda r: r["score"] if r["score"] is not None else float("-inf"), reverse=True)
+    print(f"[TUNE OK] {case_path.name}: results appended to {table_file}")
+    return rows
+
+
+# --------------------------------------------------
+# RESULTS TABLE
+# --------------------------------------------------
+
+def load_table(path):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_rows(path, rows):
+    path = Path(path)
+    table = load_table(path) + rows
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(table, f, indent=2)
+    os.replace(tmp, path)
+
+
+def best_settings(table, cells, size_tolerance=2.0):
+    """
+    Winning settings for a mesh of `cells` cells.
+
+    Uses the trials of the tuned case closest in size (log scale), if it is
+    within a factor size_tolerance; among its successful variants the
+    highest score wins. Returns None when no trial is close enough.
+    """
+    candidates = [r for r in table if r.get("ok") and r.get("score") is not None and r.get("cells")]
+    if not candidates or not cells:
+        return None
+
+    def distance(row):
+        return abs(math.log(row["cells"] / cells))
+
+    nearest = min(candidates, key=distance)
+    if distance(nearest) > math.log(size_tolerance):
+        return None
+
+    # All trials of that reference case (possibly run more than once: average per variant)
+    scores = {}
+    for r in candidates:
+        if r["case"] == nearest["case"] and r["cells"] == nearest["cells"]:
+            scores.setdefault(variant_key(r["settings"]), []).append(r["score"])
+    best = max(scores, key=lambda k: sum(scores[k]) / len(scores[k]))
+    return json.loads(best)
+
+
+def print_table(table):
+    if not table:
+        print("No tuning trials recorded.")
+        return
+    print(f"{'case':<24}{'cells':>10}{'procs':>6}{'s/it':>8}{'drop':>7}{'score':>9}  settings (vs baseline)")
+    print("-" * 100)
+    for r in sorted(table, key=lambda r: (r["case"], -(r["score"] or float("-inf")))):
+        changed = {k: v for k, v in r["settings"].items() if v != BASELINE_SETTINGS.get(k)} or "baseline"
+        spi = f"{r['seconds_per_iteration']:.3f}" if r["seconds_per_iteration"] else "-"
+        drop = f"{r['mean_drop']:.2f}" if r["mean_drop"] is not None and math.isfinite(r["mean_drop"]) else "-"
+        score = f"{r['score']:.4f}" if r["score"] is not None else "FAIL"
+        print(f"{r['case']:<24}{r['cells']:>10}{r['n_procs']:>6}{spi:>8}{drop:>7}{score:>9}  {changed}")
@@ -1,20 +1,70 @@
 from pathlib import Path
-from shutil import copytree, ignore_patterns
-from jinja2 import Template
+from shutil import copyfile, copytree, ignore_patterns
 import json
 import os
+import re
 import subprocess
-from multiprocessing import Pool
+import threading
+import time
 from datetime import datetime
+from pipelineMetrics import (MetricsRecorder, NullRecorder, append_jsonl, parse_rsync_bytes, parse_cell_count,
+                             parse_check_mesh, parse_solver_log)
+
+END_TIME_PATTERN = re.compile(r'endTime\s+(\d+);')
+
+# Exit code of openfoam.sh after a write-and-stop at the walltime (scratch staging)
+STOPPED_EARLY_EXIT = "3"
+
+# sbatch rejections caused by per-user/account submit limits (QOS or association)
+SUBMIT_LIMIT_PATTERN = re.compile(r'MaxSubmitJob|MaxJobs|Job violates accounting/QOS policy', re.IGNORECASE)
+
+# Lists time directories (also in processor0/, for running jobs), log files and
+# postProcessing/ of every case name read from stdin, one tab-separated line per
+# entry: case[/processor0], name, type, size, mtime
+REMOTE_INVENTORY_SCRIPT = r"""cd {root} || exit 1
+while read -r c; do
+    if [ -d "$c" ]; then
+        find "$c" -mindepth 1 -maxdepth 1 \( -name 'log.*' -o -name postProcessing -o -regex '.*/[0-9]+' \) -printf '%h\t%f\t%y\t%s\t%T@\n'
+        [ -d "$c/processor0" ] && find "$c/processor0" -mindepth 1 -maxdepth 1 -regex '.*/[0-9]+' -printf '%h\t%f\t%y\t%s\t%T@\n'
+        printf '%s\t\t-\t0\t0\n' "$c"
+    fi
+done
+"""
+
+# Shared by all generator instances and monitor threads (a lock can't be pickled to Pool workers)
+_INVENTORY_LOCK = threading.Lock()
+
+# One lock per case_status.json: the monitor updates statuses from worker threads and the event loop
+_STATUS_LOCKS = {}
+_STATUS_LOCKS_LOCK = threading.Lock()
+
+
+def _status_lock(status_file):
+    with _STATUS_LOCKS_LOCK:
+        return _STATUS_LOCKS.setdefault(str(status_file), threading.Lock())
+
+
+def _write_json(path, data):
+    """Write JSON via a temp file and os.replace, so readers never see a partial file."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
 
 
 class OpenFOAMCaseGenerator:
 
-    def __init__(self, template_path, input_dir, output_dir, deucalion_path=None):
+    def __init__(self, template_path, input_dir, output_dir, deucalion_path=None, metrics_file=None):
         self.template_path = Path(template_path)
         self.input_root = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Per-stage timing events (metrics_file=False disables recording)
+        if metrics_file is False:
+            self.metrics = NullRecorder()
+        else:
+            self.metrics = MetricsRecorder(metrics_file or self.output_dir / "pipeline_metrics.jsonl")
         
         # Deucalion remote path
         self.deucalion_host = "deucalion"
@@ -26,9 +76,37 @@ class OpenFOAMCaseGenerator:
             "partition": "normal-x86",
             "nodes": 1,
             "ntasks": 128,
-            "walltime": "10:00:00"
+            "walltime": "10:00:00",
+            # Optional staging: run in node-local scratch / burst buffer (e.g. "$LOCALSCRATCH"),
+            # copy back logs, postProcessing and the latest time. None = run in place.
+            "scratch_dir": None,
+            "scratch_shared": False,  # True if every node sees scratch_dir (burst buffer)
+            "scratch_signal_seconds": 300  # Write-and-stop this long before the walltime
+        }
+
+        # Run control defaults rendered into controlDict
+        self.run_defaults = {
+            "end_time": 20000,
+            "write_interval": 5000,
+            "scheme_switch_time": 1000  # fvSchemes_1 -> fvSchemes_2
         }
 
+        # checkMesh figures of every meshed case, one JSON line per meshing (see meshQuality.py)
+        self.mesh_quality_file = self.output_dir / "mesh_quality.jsonl"
+
+        # Solver settings from trial runs (see solverTuning.py), applied after meshing
+        self.tuning_file = self.output_dir / "solver_tuning.json"
+        self.tuning_size_tolerance = 2.0
+
+        # Remote inventory cache (see get_remote_inventory)
+        self.inventory_file = self.output_dir / "remote_inventory.json"
+        self.inventory_ttl = 300
+        self._inventory = None
+        self._end_time_cache = {}
+
+        # Set when sbatch is rejected for a submit limit (see SubmissionController)
+        self.submit_limit_hit = False
+
     # --------------------------------------------------
     # CASE DISCOVERY
     # --------------------------------------------------
@@ -83,12 +161,35 @@ class OpenFOAMCaseGenerator:
         if j2_path.suffix != '.j2':
             raise ValueError(f"Expected a .j2 file, got: {j2_path}")
         output_path = j2_path.with_suffix('')
+        # Imported here so status queries don't pay for jinja2
+        from jinja2 import Template
         with open(j2_path) as f:
             template = Template(f.read())
         with open(output_path, 'w') as f:
             f.write(template.render(context))
         j2_path.unlink()
 
+    def rerender_from_template(self, case_path, relative_path, **overrides):
+        """
+        Render a template .j2 file again into an existing case, e.g.
+        rerender_from_template(case, "system/fvSolution", relax_p=0.3).
+        The context is rebuilt from the case's pipeline_metadata.json.
+        """
+        case_path = Path(case_path)
+        with open(case_path / 'pipeline_metadata.json') as f:
+            metadata = json.load(f)
+
+        context = {
+            **self.run_defaults,
+            'n_procs': self.hpc_defaults["ntasks"],
+            'wind_direction': metadata.get('wind_direction_deg', 0),
+            **metadata,
+            **overrides
+        }
+        j2_path = case_path / f"{relative_path}.j2"
+        copyfile(self.template_path / f"{relative_path}.j2", j2_path)
+        self.render_j2_file(j2_path, context)
+
     # --------------------------------------------------
     # CASE SETUP
     # --------------------------------------------------
@@ -97,49 +198,51 @@ class OpenFOAMCaseGenerator:
         case_name = f"case_{case_info['terrain_index']}_{case_info['rotation_degree']:03d}deg"
         output_case = self.output_dir / case_name
 
-        context = {
-            'terrain_index': case_info['terrain_index'],
-            'rotation_degree': case_info['rotation_degree'],
-            'location': case_info['location'],
-            'end_time': 20000,
-            'write_interval': 5000,
-            'n_procs': self.hpc_defaults["ntasks"],
-            'wind_direction': case_info['metadata'].get('wind_direction_deg', 0),
-            **case_info['metadata']
-        }
+        with self.metrics.stage(case_name, "generate"):
+            context = {
+                'terrain_index': case_info['terrain_index'],
+                'rotation_degree': case_info['rotation_degree'],
+                'location': case_info['location'],
+                'end_time': self.run_defaults["end_time"],
+                'write_interval': self.run_defaults["write_interval"],
+                'scheme_switch_time': self.run_defaults["scheme_switch_time"],
+                'n_procs': self.hpc_defaults["ntasks"],
+                'wind_direction': case_info['metadata'].get('wind_direction_deg', 0),
+                **case_info['metadata']
+            }
 
-        # Copy template
-        copytree(self.template_path, output_case, dirs_exist_ok=True)
-
-        # Render OpenFOAM dictionary files
-        files_to_render = [
-            output_case / 'system' / 'controlDict.j2',
-            output_case / 'system' / 'decomposeParDict.j2',
-            output_case / 'system' / 'fvSolution.j2',
-        ]
-
-        for file in files_to_render:
-            if file.exists():
-                self.render_j2_file(file, context)
-
-        # Render openfoam.sh from template
-        self.render_hpc_script(output_case, case_name)
-
-        # Copy metadata
-        metadata_dest = output_case / 'pipeline_metadata.json'
-        with open(metadata_dest, 'w') as f:
-            json.dump(case_info['metadata'], f, indent=2)
-
-        # Merge geometry / input files
-        copytree(
-            case_info['case_dir'],
-            output_case,
-            dirs_exist_ok=True,
-            ignore=ignore_patterns('*.png', '*.vtk', 'pipeline_metadata.json')
-        )
+            # Copy template
+            copytree(self.template_path, output_case, dirs_exist_ok=True)
+
+            # Render OpenFOAM dictionary files
+            files_to_render = [
+                output_case / 'system' / 'controlDict.j2',
+                output_case / 'system' / 'decomposeParDict.j2',
+                output_case / 'system' / 'fvSolution.j2',
+            ]
+
+            for file in files_to_render:
+                if file.exists():
+                    self.render_j2_file(file, context)
 
-        # Initialize status file
-        self.initialize_case_status(output_case)
+            # Render openfoam.sh from template
+            self.render_hpc_script(output_case, case_name)
+
+            # Copy metadata
+            metadata_dest = output_case / 'pipeline_metadata.json'
+            with open(metadata_dest, 'w') as f:
+                json.dump(case_info['metadata'], f, indent=2)
+
+            # Merge geometry / input files
+            copytree(
+                case_info['case_dir'],
+                output_case,
+                dirs_exist_ok=True,
+                ignore=ignore_patterns('*.png', '*.vtk', 'pipeline_metadata.json')
+            )
+
+            # Initialize status file
+            self.initialize_case_status(output_case)
 
         return output_case
 
@@ -163,19 +266,17 @@ class OpenFOAMCaseGenerator:
                 "results_fetched": False,
                 "last_fetched_timestep": None
             }
-            with open(status_file, 'w') as f:
-                json.dump(status, f, indent=2)
+            _write_json(status_file, status)
 
     def update_status(self, case_path, updates):
         case_path = Path(case_path)
         status_file = case_path / "case_status.json"
-        with open(status_file) as f:
-            status = json.load(f)
-
-        status.update(updates)
+        with _status_lock(status_file):
+            with open(status_file) as f:
+                status = json.load(f)
 
-        with open(status_file, 'w') as f:
-            json.dump(status, f, indent=2)
+            status.update(updates)
+            _write_json(status_file, status)
 
     def get_status(self, case_path):
         case_path = Path(case_path)
@@ -194,55 +295,81 @@ class OpenFOAMCaseGenerator:
         case_path = Path(case_path)  # Ensure Path object
         print(f"[MESH START] {case_path.name}")
 
-        try:
-            env = os.environ.copy()
-            env["RUN_STAGE"] = "mesh"
-
-            subprocess.run(
-                ["bash", "Allrun"],
-                cwd=case_path,
-                env=env,
-                check=True,
-                capture_output=True,
-                text=True
-            )
+        with self.metrics.stage(case_path, "mesh") as m:
+            try:
+                env = os.environ.copy()
+                env["RUN_STAGE"] = "mesh"
 
-            # Check mesh log
-            log_file = case_path / "log.checkMesh"
+                subprocess.run(
+                    ["bash", "Allrun"],
+                    cwd=case_path,
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                    text=True
+                )
 
-            if log_file.exists():
-                with open(log_file) as f:
-                    content = f.read()
+                # Check mesh log
+                log_file = case_path / "log.checkMesh"
 
-                if "Mesh OK" in content:
-                    print(f"[MESH OK] {case_path.name}")
-                    self.update_status(case_path, {
-                        "mesh_status": "DONE",
-                        "mesh_ok": True
-                    })
-                    return True
+                if log_file.exists():
+                    quality = self.record_mesh_quality(case_path)
+                    m["cells"] = quality["cells"]
+
+                    if quality["mesh_ok"]:
+                        print(f"[MESH OK] {case_path.name}")
+                        self.update_status(case_path, {
+                            "mesh_status": "DONE",
+                            "mesh_ok": True
+                        })
+                        try:
+                            self.apply_tuned_solver_settings(case_path, m["cells"])
+                        except Exception as e:
+                            # The mesh is fine; the case keeps the template solver settings
+                            print(f"[TUNED ERROR] {case_path.name}: {type(e).__name__}: {e}")
+                        return True
+                    else:
+                        print(f"[MESH FAILED] {case_path.name}")
+                        self.update_status(case_path, {
+                            "mesh_status": "FAILED",
+                            "mesh_ok": False
+                        })
+                        m["ok"] = False
+                        return False
                 else:
-                    print(f"[MESH FAILED] {case_path.name}")
+                    print(f"[MESH ERROR] No log.checkMesh found for {case_path.name}")
                     self.update_status(case_path, {
-                        "mesh_status": "FAILED",
+                        "mesh_status": "ERROR",
                         "mesh_ok": False
                     })
+                    m["ok"] = False
                     return False
-            else:
-                print(f"[MESH ERROR] No log.checkMesh found for {case_path.name}")
+
+            except subprocess.CalledProcessError as e:
+                print(f"[MESH ERROR] {case_path.name}: {e}")
                 self.update_status(case_path, {
                     "mesh_status": "ERROR",
                     "mesh_ok": False
                 })
+                m["ok"] = False
                 return False
 
-        except subprocess.CalledProcessError as e:
-            print(f"[MESH ERROR] {case_path.name}: {e}")
-            self.update_status(case_path, {
-                "mesh_status": "ERROR",
-                "mesh_ok": False
-            })
-            return False
+    def record_mesh_quality(self, case_path, quality=None):
+        """Store checkMesh figures in case_status.json and append them to the dataset table."""
+        case_path = Path(case_path)
+        if quality is None:
+            quality = parse_check_mesh(case_path / "log.checkMesh")
+        self.update_status(case_path, {"mesh_quality": quality})
+        append_jsonl(self.mesh_quality_file, {"case": case_path.name, **quality})
+        return quality
+
+    def get_cell_count(self, case_path):
+        """Cell count from the case status, falling back to log.checkMesh for cases meshed earlier."""
+        case_path = Path(case_path)
+        quality = (self.get_status(case_path) or {}).get("mesh_quality")
+        if quality and quality.get("cells"):
+            return quality["cells"]
+        return parse_cell_count(case_path / "log.checkMesh")
 
     # --------------------------------------------------
     # PARALLEL MESHING
@@ -254,6 +381,7 @@ class OpenFOAMCaseGenerator:
         print(f"Starting parallel meshing: {len(cases)} cases, {n_workers} workers")
         print(f"{'='*60}\n")
 
+        from multiprocessing import Pool
         with Pool(n_workers) as pool:
             results = pool.map(self.mesh_case, cases)
 
@@ -267,6 +395,31 @@ class OpenFOAMCaseGenerator:
 
         return results
 
+    # --------------------------------------------------
+    # TUNED SOLVER SETTINGS
+    # --------------------------------------------------
+
+    def apply_tuned_solver_settings(self, case_path, cells=None):
+        """Re-render fvSolution with the best trial-run settings for a mesh of this size, if any."""
+        if not self.tuning_file.exists():
+            return None
+        from solverTuning import load_table, best_settings
+
+        case_path = Path(case_path)
+        if cells is None:
+            cells = self.get_cell_count(case_path)
+        if not cells:
+            return None
+
+        settings = best_settings(load_table(self.tuning_file), cells, self.tuning_size_tolerance)
+        if not settings:
+            return None
+
+        self.rerender_from_template(case_path, "system/fvSolution", **settings)
+        self.update_status(case_path, {"solver_settings": settings})
+        print(f"[TUNED] {case_path.name}: {settings}")
+        return settings
+
     # --------------------------------------------------
     # HPC SCRIPT RENDERING
     # --------------------------------------------------
@@ -276,6 +429,11 @@ class OpenFOAMCaseGenerator:
         j2_file = case_path / "openfoam.sh.j2"
         if j2_file.exists():
             context = {"job_name": f"of_{case_name}", **self.hpc_defaults}
+            if context["scratch_dir"] and context["nodes"] > 1 and not context["scratch_shared"]:
+                raise ValueError(
+                    f"scratch_dir {context['scratch_dir']!r} is node-local but the job spans "
+                    f"{context['nodes']} nodes; set scratch_shared=True for a shared burst buffer"
+                )
             self.render_j2_file(j2_file, context)
             os.chmod(case_path / "openfoam.sh", 0o755)
 
@@ -290,30 +448,33 @@ class OpenFOAMCaseGenerator:
         
         print(f"[COPY START] {case_name} -> deucalion")
 
-        try:
-            # Rsync with compression, preserve permissions
-            cmd = [
-                "rsync",
-                "-avz",  # archive, verbose, compress
-                "--progress",
-                f"{case_path}/",
-                f"{self.deucalion_host}:{self.deucalion_path}/{case_name}/"
-            ]
+        with self.metrics.stage(case_path, "upload") as m:
+            try:
+                # Rsync with compression, preserve permissions
+                cmd = [
+                    "rsync",
+                    "-avz",  # archive, verbose, compress
+                    "--progress",
+                    f"{case_path}/",
+                    f"{self.deucalion_host}:{self.deucalion_path}/{case_name}/"
+                ]
 
-            result = subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True
-            )
+                result = subprocess.run(
+                    cmd,
+                    check=True,
+                    capture_output=True,
+                    text=True
+                )
 
-            print(f"[COPY OK] {case_name}")
-            self.update_status(case_path, {"copied_to_hpc": True})
-            return True
+                print(f"[COPY OK] {case_name}")
+                m["bytes_sent"], _ = parse_rsync_bytes(result.stdout)
+                self.update_status(case_path, {"copied_to_hpc": True})
+                return True
 
-        except subprocess.CalledProcessError as e:
-            print(f"[COPY FAILED] {case_name}: {e.stderr}")
-            return False
+            except subprocess.CalledProcessError as e:
+                print(f"[COPY FAILED] {case_name}: {e.stderr}")
+                m["ok"] = False
+                return False
 
     # --------------------------------------------------
     # HPC SUBMISSION
@@ -326,41 +487,79 @@ class OpenFOAMCaseGenerator:
         
         print(f"[SUBMIT START] {case_name}")
 
-        try:
-            # SSH into deucalion and submit
-            cmd = [
-                "ssh",
-                self.deucalion_host,
-                f"cd {self.deucalion_path}/{case_name} && sbatch openfoam.sh"
-            ]
+        with self.metrics.stage(case_path, "submit") as m:
+            try:
+                # SSH into deucalion and submit
+                cmd = [
+                    "ssh",
+                    self.deucalion_host,
+                    f"cd {self.deucalion_path}/{case_name} && sbatch openfoam.sh"
+                ]
 
-            result = subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True
-            )
+                result = subprocess.run(
+                    cmd,
+                    check=True,
+                    capture_output=True,
+                    text=True
+                )
 
-            # Parse job ID from sbatch output: "Submitted batch job 123456"
-            output = result.stdout.strip()
-            if "Submitted batch job" in output:
-                job_id = output.split()[-1]
-                print(f"[SUBMIT OK] {case_name} -> Job ID: {job_id}")
+                # Parse job ID from sbatch output: "Submitted batch job 123456"
+                output = result.stdout.strip()
+                if "Submitted batch job" in output:
+                    job_id = output.split()[-1]
+                    print(f"[SUBMIT OK] {case_name} -> Job ID: {job_id}")
                 
-                self.update_status(case_path, {
-                    "submitted": True,
-                    "job_id": job_id,
-                    "job_status": "PENDING",
-                    "last_checked": datetime.now().isoformat()
-                })
-                return job_id
-            else:
-                print(f"[SUBMIT ERROR] {case_name}: Unexpected sbatch output")
+                    self.update_status(case_path, {
+                        "submitted": True,
+                        "job_id": job_id,
+                        "job_status": "PENDING",
+                        "submitted_at": datetime.now().isoformat(),
+                        "last_checked": datetime.now().isoformat()
+                    })
+                    return job_id
+                else:
+                    print(f"[SUBMIT ERROR] {case_name}: Unexpected sbatch output")
+                    m["ok"] = False
+                    return None
+
+            except subprocess.CalledProcessError as e:
+                print(f"[SUBMIT FAILED] {case_name}: {e.stderr}")
+                if SUBMIT_LIMIT_PATTERN.search(e.stderr or ""):
+                    self.submit_limit_hit = True
+                    m["submit_limit"] = True
+                m["ok"] = False
                 return None
 
-        except subprocess.CalledProcessError as e:
-            print(f"[SUBMIT FAILED] {case_name}: {e.stderr}")
-            return None
+    def prepare_resubmit(self, case_path, attempt):
+        """
+        Get a remote case that ran out of time ready to continue from its
+        latest time: RunFunctions skips any application whose log exists, so
+        the solver and reconstruct logs are moved aside (log.simpleFoam is
+        kept as log.simpleFoam.<attempt>). log.decomposePar is only removed
+        when the processor directories are gone, so a case still decomposed
+        isn't decomposed again. Returns True on success.
+        """
+        case_name = Path(case_path).name
+        cmd = (
+            f"cd {self.deucalion_path}/{case_name} && "
+            f"{{ [ -d processor0 ] || rm -f log.decomposePar; }} && "
+            f"{{ [ ! -f log.simpleFoam ] || mv log.simpleFoam log.simpleFoam.{attempt}; }} && "
+            f"rm -f log.reconstructParMesh log.reconstructPar"
+        )
+        try:
+            result = subprocess.run(
+                ["ssh", self.deucalion_host, cmd],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+        except subprocess.TimeoutExpired:
+            print(f"[RESUBMIT ERROR] {case_name}: SSH timed out")
+            return False
+        if result.returncode != 0:
+            print(f"[RESUBMIT ERROR] {case_name}: {result.stderr.strip()}")
+            return False
+        return True
 
     # --------------------------------------------------
     # JOB STATUS CHECK
@@ -407,6 +606,130 @@ class OpenFOAMCaseGenerator:
             print(f"[STATUS CHECK ERROR] Job {job_id}: {e}")
             return "ERROR"
 
+    def check_job_statuses(self, job_ids):
+        """Check many jobs in one SSH round-trip. Returns {job_id: state}; unreachable jobs are omitted."""
+        job_ids = [str(j) for j in job_ids if j]
+        if not job_ids:
+            return {}
+
+        id_list = ",".join(job_ids)
+        # squeue covers pending/running jobs, sacct the ones that already left the queue
+        cmd = (
+            f"squeue -j {id_list} --noheader --format='%i %T' 2>/dev/null; "
+            f"echo '--'; "
+            f"sacct -j {id_list} --noheader -X -P --format=JobID,State,ExitCode 2>/dev/null"
+        )
+
+        try:
+            result = subprocess.run(
+                ["ssh", self.deucalion_host, cmd],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+        except subprocess.TimeoutExpired:
+            print(f"[STATUS CHECK ERROR] SSH timed out querying {len(job_ids)} job(s)")
+            return {}
+
+        queued, _, accounted = result.stdout.partition("--")
+        states = {}
+
+        # sacct first so that live squeue states take precedence
+        for line in accounted.strip().splitlines():
+            parts = line.split("|")
+            if len(parts) >= 2 and parts[0] in job_ids:
+                # e.g. "CANCELLED by 1234" -> "CANCELLED"
+                state = parts[1].split()[0].upper()
+                # The job script stopped the solver before the walltime: same as a timeout
+                if state == "FAILED" and len(parts) >= 3 and parts[2].split(":")[0] == STOPPED_EARLY_EXIT:
+                    state = "TIMEOUT"
+                states[parts[0]] = state
+
+        for line in queued.strip().splitlines():
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] in job_ids:
+                states[parts[0]] = parts[1].upper()
+
+        return states
+
+    def get_queue_counts(self):
+        """
+        Our jobs on the partition by state ({"PENDING": n, "RUNNING": m, ...}),
+        whether submitted by this pipeline or not. None if squeue can't be reached.
+        """
+        partition = self.hpc_defaults["partition"]
+        cmd = f"squeue -u $USER -p {partition} --noheader --format=%T"
+        try:
+            result = subprocess.run(
+                ["ssh", self.deucalion_host, cmd],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+        except subprocess.TimeoutExpired:
+            print("[QUEUE CHECK ERROR] SSH timed out")
+            return None
+        if result.returncode != 0:
+            print(f"[QUEUE CHECK ERROR] {result.stderr.strip()}")
+            return None
+
+        counts = {}
+        for line in result.stdout.split():
+            state = line.strip().upper()
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def get_job_times(self, job_id):
+        """Submit/Start/End times of a job from sacct, as datetimes (None where unknown)."""
+        cmd = f"sacct -j {job_id} --noheader -X -P --format=Submit,Start,End 2>/dev/null | head -1"
+        try:
+            result = subprocess.run(
+                ["ssh", self.deucalion_host, cmd],
+                capture_output=True,
+                text=True,
+                timeout=15
+            )
+        except subprocess.TimeoutExpired:
+            return None
+
+        parts = result.stdout.strip().split("|")
+        if result.returncode != 0 or len(parts) != 3:
+            return None
+
+        times = {}
+        for key, value in zip(("submit", "start", "end"), parts):
+            try:
+                times[key] = datetime.fromisoformat(value)
+            except ValueError:
+                # "Unknown", "None" for jobs that never started/ended
+                times[key] = None
+        return times
+
+    def record_job_metrics(self, case_path, job_status=None):
+        """Record queue-wait and solve durations of a finished job from scheduler accounting."""
+        status = self.get_status(case_path)
+        if not status or not status.get("job_id"):
+            return
+        job_id = status["job_id"]
+        if status.get("metrics_recorded_job") == job_id:
+            return
+
+        times = self.get_job_times(job_id)
+        if not times or not times["submit"] or not times["start"]:
+            return
+
+        self.metrics.record(case_path, "queue", "end", job_id=job_id,
+                            duration=(times["start"] - times["submit"]).total_seconds(),
+                            end_ts=times["start"].isoformat(), ok=True)
+        if times["end"]:
+            self.metrics.record(case_path, "solve", "end", job_id=job_id,
+                                duration=(times["end"] - times["start"]).total_seconds(),
+                                end_ts=times["end"].isoformat(),
+                                job_status=job_status or status.get("job_status"),
+                                ok=(job_status or status.get("job_status")) == "COMPLETED")
+
+        self.update_status(case_path, {"metrics_recorded_job": job_id})
+
     def update_job_status(self, case_path):
         """Update job status for a specific case"""
         status = self.get_status(case_path)
@@ -436,7 +759,12 @@ class OpenFOAMCaseGenerator:
             if not case_dir.is_dir():
                 continue
                 
-            status = self.get_status(case_dir)
+            try:
+                status = self.get_status(case_dir)
+            except json.JSONDecodeError:
+                # e.g. a status file written by hand or truncated by a full disk
+                print(f"[STATUS ERROR] {case_dir.name}: unreadable case_status.json, skipped")
+                continue
             if not status:
                 continue
 
@@ -484,25 +812,147 @@ class OpenFOAMCaseGenerator:
         case_path = Path(case_path)
         control_dict = case_path / "system" / "controlDict"
         
-        if not control_dict.exists():
+        try:
+            mtime = control_dict.stat().st_mtime_ns
+        except FileNotFoundError:
             return None
-        
+
+        # Re-parse only when controlDict changed since the last call
+        cached = self._end_time_cache.get(control_dict)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
         try:
             with open(control_dict) as f:
                 content = f.read()
             
             # Look for "endTime" entry (simple parsing)
-            import re
-            match = re.search(r'endTime\s+(\d+);', content)
-            if match:
-                return int(match.group(1))
-            return None
+            match = END_TIME_PATTERN.search(content)
+            end_time = int(match.group(1)) if match else None
+            self._end_time_cache[control_dict] = (mtime, end_time)
+            return end_time
         except Exception as e:
             print(f"Error parsing controlDict: {e}")
             return None
 
+    # --------------------------------------------------
+    # REMOTE INVENTORY (cached, one SSH call for many cases)
+    # --------------------------------------------------
+
+    def _load_inventory(self):
+        if self._inventory is None:
+            try:
+                with open(self.inventory_file) as f:
+                    self._inventory = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._inventory = {}
+        return self._inventory
+
+    def _query_inventory(self, case_names):
+        """Run the inventory script over SSH for case_names. Returns {case_name: entry}."""
+        result = subprocess.run(
+            ["ssh", self.deucalion_host, REMOTE_INVENTORY_SCRIPT.format(root=self.deucalion_path)],
+            input="\n".join(case_names) + "\n",
+            capture_output=True,
+            text=True,
+            timeout=30 + len(case_names) // 20
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"ssh exited with {result.returncode}")
+
+        now = time.time()
+        found = {}
+        for line in result.stdout.splitlines():
+            parts = line.split("\t")
+            if len(parts) != 5:
+                continue
+            case, name, kind, size, mtime = parts
+            case, _, subdir = case.partition("/")
+            entry = found.setdefault(case, {
+                "checked_at": now, "exists": True, "time_dirs": {}, "processor_time_dirs": {},
+                "logs": {}, "has_postProcessing": False
+            })
+            if kind == "-":
+                continue  # end-of-case marker, keeps empty cases in the result
+            if subdir:
+                if kind == "d" and name.isdigit():
+                    entry["processor_time_dirs"][name] = float(mtime)
+            elif kind == "d" and name.isdigit():
+                entry["time_dirs"][name] = float(mtime)
+            elif kind == "d" and name == "postProcessing":
+                entry["has_postProcessing"] = True
+            elif kind == "f" and name.startswith("log."):
+                entry["logs"][name] = {"size": int(size), "mtime": float(mtime)}
+
+        for case in case_names:
+            found.setdefault(case, {
+                "checked_at": now, "exists": False, "time_dirs": {}, "processor_time_dirs": {},
+                "logs": {}, "has_postProcessing": False
+            })
+        return found
+
+    def get_remote_inventory(self, case_names, max_age=None):
+        """
+        Time directories (reconstructed and in processor0/), log files
+        (size, mtime) and postProcessing/ presence of remote cases, keyed
+        by case name.
+
+        Entries younger than max_age seconds (default self.inventory_ttl) come
+        from the local cache; all others are refreshed together in a single
+        SSH round-trip. Pass max_age=0 to force a refresh.
+        """
+        max_age = self.inventory_ttl if max_age is None else max_age
+        case_names = [Path(c).name for c in case_names]
+
+        with _INVENTORY_LOCK:
+            inventory = self._load_inventory()
+            now = time.time()
+            stale = [c for c in case_names
+                     if c not in inventory or now - inventory[c]["checked_at"] >= max_age]
+
+            if stale:
+                try:
+                    inventory.update(self._query_inventory(stale))
+                except (subprocess.TimeoutExpired, RuntimeError) as e:
+                    print(f"[INVENTORY ERROR] {len(stale)} case(s): {e}")
+                else:
+                    tmp = self.inventory_file.with_suffix(".tmp")
+                    with open(tmp, "w") as f:
+                        json.dump(inventory, f)
+                    os.replace(tmp, self.inventory_file)
+
+            return {c: inventory[c] for c in case_names if c in inventory}
+
+    def _inventory_entry(self, case_path_remote):
+        """Inventory entry for a remote case under deucalion_path, or None for other locations."""
+        case_path_remote = Path(case_path_remote)
+        if str(case_path_remote.parent) != str(Path(self.deucalion_path)):
+            return None
+        return self.get_remote_inventory([case_path_remote.name]).get(case_path_remote.name)
+
+    def get_remote_logs(self, case_path_remote, exclude=("log.blockMesh", "log.checkMesh")):
+        """Names of log files in a remote case (default: without blockMesh/checkMesh), or None on error."""
+        entry = self._inventory_entry(case_path_remote)
+        if entry is not None:
+            return sorted(name for name in entry["logs"] if name not in exclude)
+
+        cmd_str = "ls -1 {} | grep '^log\\.'".format(case_path_remote)
+        result = subprocess.run(
+            ["ssh", self.deucalion_host, cmd_str],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        if result.returncode != 0:
+            return None
+        return [name for name in result.stdout.strip().split('\n') if name and name not in exclude]
+
     def get_result_timesteps(self, case_path_remote):
         """Query remote OpenFOAM case directory to find available timestep directories"""
+        entry = self._inventory_entry(case_path_remote)
+        if entry is not None:
+            return sorted(int(ts) for ts in entry["time_dirs"])
+
         try:
             # List all numeric directories in the remote case
             cmd = f"ls -1 {case_path_remote} | grep -E '^[0-9]+$' | sort -n"
@@ -543,96 +993,122 @@ class OpenFOAMCaseGenerator:
         case_local = Path(case_local)
         case_name = case_local.name
         
+        refresh_inventory = case_remote is None
         if case_remote is None:
             case_remote = f"{self.deucalion_path}/{case_name}"
         
         print(f"[FETCH START] {case_name} from {self.deucalion_host}")
         
-        try:
-            # 1. Fetch postProcessing folder if requested
-            if fetch_postprocessing:
-                print(f"  → Fetching postProcessing/…")
-                cmd = [
-                    "rsync",
-                    "-avz",
-                    f"{self.deucalion_host}:{case_remote}/postProcessing/",
-                    str(case_local) + "/postProcessing/"
-                ]
-                try:
-                    subprocess.run(cmd, check=False, capture_output=True, timeout=120)
-                    print(f"    ✓ postProcessing synced")
-                except Exception as e:
-                    print(f"    ⚠ postProcessing sync failed: {e}")
+        with self.metrics.stage(case_local, "fetch") as m:
+            m["bytes_received"] = 0
+            try:
+                if refresh_inventory:
+                    # Listing must reflect the finished job; anything from the last minute will do
+                    # (fetch_multiple_results and the monitor refresh many cases at once beforehand)
+                    self.get_remote_inventory([case_name], max_age=60)
+
+                # 1. Fetch postProcessing folder if requested
+                if fetch_postprocessing:
+                    print(f"  → Fetching postProcessing/…")
+                    cmd = [
+                        "rsync",
+                        "-avz",
+                        f"{self.deucalion_host}:{case_remote}/postProcessing/",
+                        str(case_local) + "/postProcessing/"
+                    ]
+                    try:
+                        result = subprocess.run(cmd, check=False, capture_output=True, text=True, timeout=120)
+                        m["bytes_received"] += parse_rsync_bytes(result.stdout)[1] or 0
+                        print(f"    ✓ postProcessing synced")
+                    except Exception as e:
+                        print(f"    ⚠ postProcessing sync failed: {e}")
             
-            # 2. Fetch log files (excluding blockMesh/checkMesh)
-            if fetch_logs:
-                print(f"  → Fetching log files…")
-                excluded_logs = ["log.blockMesh", "log.checkMesh"]
-                
-                # Get list of logs on remote
-                cmd_str = "ls -1 {} | grep '^log\\.' | grep -v -E '(blockMesh|checkMesh)'".format(case_remote)
-                result = subprocess.run(
-                    ["ssh", self.deucalion_host, cmd_str],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    log_files = result.stdout.strip().split('\n')
-                    for log_file in log_files:
+                # 2. Fetch log files (excluding blockMesh/checkMesh)
+                if fetch_logs:
+                    print(f"  → Fetching log files…")
+                    # Log names come from the cached remote inventory where possible
+                    log_files = self.get_remote_logs(case_remote)
+
+                    if log_files:
                         try:
-                            remote_file = f"{self.deucalion_host}:{case_remote}/{log_file}"
-                            local_file = case_local / log_file
-                            subprocess.run(
-                                ["rsync", "-avz", remote_file, str(local_file)],
+                            # One rsync session for all logs
+                            sync = subprocess.run(
+                                ["rsync", "-avz", "--files-from=-",
+                                 f"{self.deucalion_host}:{case_remote}/", str(case_local) + "/"],
+                                input="\n".join(log_files) + "\n",
                                 check=False,
                                 capture_output=True,
-                                timeout=60
+                                text=True,
+                                timeout=60 + 10 * len(log_files)
                             )
+                            m["bytes_received"] += parse_rsync_bytes(sync.stdout)[1] or 0
+                            print(f"    ✓ {len(log_files)} log file(s) synced")
                         except Exception as e:
-                            print(f"    ⚠ Failed to fetch {log_file}: {e}")
-                    print(f"    ✓ {len(log_files)} log file(s) synced")
-                else:
-                    print(f"    ⚠ No log files found or error querying")
+                            print(f"    ⚠ Failed to fetch log files: {e}")
+                    else:
+                        print(f"    ⚠ No log files found or error querying")
             
-            # 3. Fetch last timestep directory if requested
-            if fetch_last_timestep:
-                print(f"  → Fetching last timestep…")
-                timesteps = self.get_result_timesteps(case_remote)
+                # 3. Fetch last timestep directory if requested
+                if fetch_last_timestep:
+                    print(f"  → Fetching last timestep…")
+                    timesteps = self.get_result_timesteps(case_remote)
                 
-                if timesteps:
-                    last_ts = timesteps[-1]
-                    print(f"    Last timestep found: {last_ts}")
+                    if timesteps:
+                        last_ts = timesteps[-1]
+                        print(f"    Last timestep found: {last_ts}")
                     
-                    try:
-                        cmd = [
-                            "rsync",
-                            "-avz",
-                            f"{self.deucalion_host}:{case_remote}/{last_ts}/",
-                            str(case_local / str(last_ts)) + "/"
-                        ]
-                        subprocess.run(cmd, check=True, capture_output=False, timeout=300)
-                        print(f"    ✓ Timestep {last_ts} synced")
-                        
-                        # Update status to track that results were fetched
-                        self.update_status(case_local, {"results_fetched": True, "last_fetched_timestep": last_ts})
-                    except Exception as e:
-                        print(f"    ✗ Failed to fetch timestep {last_ts}: {e}")
+                        try:
+                            cmd = [
+                                "rsync",
+                                "-avz",
+                                f"{self.deucalion_host}:{case_remote}/{last_ts}/",
+                                str(case_local / str(last_ts)) + "/"
+                            ]
+                            result = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=300)
+                            m["bytes_received"] += parse_rsync_bytes(result.stdout)[1] or 0
+                            print(f"    ✓ Timestep {last_ts} synced")
+                        except Exception as e:
+                            print(f"    ✗ Failed to fetch timestep {last_ts}: {e}")
+                            m["ok"] = False
+                            return False
+                    else:
+                        # Not fetched: the caller retries later instead of taking this as done
+                        print(f"    ✗ No timestep directories found on remote")
+                        m["ok"] = False
                         return False
-                else:
-                    print(f"    ⚠ No timestep directories found on remote")
             
-            print(f"[FETCH OK] {case_name}")
-            return True
-
-        except Exception as e:
-            print(f"[FETCH FAILED] {case_name}: {e}")
-            return False
+                # Solver speed from the fetched log
+                solver_stats = parse_solver_log(case_local / "log.simpleFoam")
+                if solver_stats:
+                    self.metrics.record(case_local, "solve", "log", **solver_stats)
+
+                if fetch_last_timestep:
+                    # A run that stopped short of endTime without converging isn't done:
+                    # the monitor continues it (run_complete False) instead of taking it as final
+                    end_time = self.get_last_timestep(case_local)
+                    run_complete = end_time is None or last_ts >= end_time \
+                        or bool(solver_stats and solver_stats["converged"])
+                    if not run_complete:
+                        print(f"    ⚠ Stopped at {last_ts}, before endTime {end_time}")
+                    # Update status to track that results were fetched
+                    self.update_status(case_local, {"results_fetched": True, "last_fetched_timestep": last_ts,
+                                                    "run_complete": run_complete})
+
+                print(f"[FETCH OK] {case_name}")
+                return True
+
+            except Exception as e:
+                print(f"[FETCH FAILED] {case_name}: {e}")
+                m["ok"] = False
+                return False
 
     def fetch_multiple_results(self, case_paths, n_workers=2, **fetch_kwargs):
         """Fetch results from multiple cases in sequence (slower but more reliable)"""
         print(f"\nFetching results from {len(case_paths)} case(s)…\n")
+
+        # Refresh the remote listing of all cases in one round-trip up front
+        if fetch_kwargs.get("case_remote") is None:
+            self.get_remote_inventory(case_paths, max_age=0)
         
         results = []
         for i, case_path in enumerate(case_paths, 1):
@@ -0,0 +1,66 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# The pipeline modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taskManager import OpenFOAMCaseGenerator  # noqa: E402
+
+TEMPLATE_PATH = Path(__file__).resolve().parent.parent / "template"
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def generator(tmp_path):
+    return OpenFOAMCaseGenerator(TEMPLATE_PATH, tmp_path / "inputs", tmp_path / "outputs", metrics_file=False)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_ready_cases(generator):
+    """Factory for meshed, not yet submitted cases (no OpenFOAM files needed by the fake backend)."""
+    def make(names, cells=None):
+        cases = []
+        for i, name in enumerate(names):
+            case = generator.output_dir / name
+            case.mkdir(parents=True)
+            generator.initialize_case_status(case)
+            generator.update_status(case, {"mesh_status": "DONE", "mesh_ok": True})
+            if cells is not None:
+                generator.update_status(case, {"mesh_quality": {"cells": cells[i]}})
+            cases.append(case)
+        return cases
+    return make
+
+
+@pytest.fixture
+def run_polls(clock):
+    """
+    Run n monitor polls, stepping the clock by `step` seconds after each.
+    Every poll waits for the actions it started, so results don't depend
+    on wall-clock timing.
+    """
+    def run(monitor, n, step=1.0):
+        for _ in range(n):
+            asyncio.run(monitor.run(max_iterations=monitor.iteration + 1))
+            clock.advance(step)
+    return run
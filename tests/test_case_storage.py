@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+import caseStorage
+from caseStorage import MESH_DIR, apply_actions, plan_case, restore_case
+
+
+@pytest.fixture
+def case(generator):
+    """A case with a compressible mesh and two result times (text fields compress well)."""
+    case = generator.output_dir / "case_0001_000deg"
+    (case / MESH_DIR).mkdir(parents=True)
+    (case / MESH_DIR / "points").write_text("(0 0 0)\n" * 20000)
+    (case / "0").mkdir()
+    (case / "0" / "U").write_text("uniform (1 0 0);\n")
+    for t in ("5000", "20000"):
+        (case / t).mkdir()
+        (case / t / "U").write_text("(1.2345 0.5 0)\n" * 20000)
+    generator.initialize_case_status(case)
+    return case
+
+
+def test_nothing_is_planned_before_upload(generator, case):
+    assert plan_case(case, generator.get_status(case)) == []
+
+
+def test_uploaded_mesh_is_pruned_in_full(generator, case):
+    actions = plan_case(case, {"copied_to_hpc": True})
+
+    assert [(a["target"], a["action"]) for a in actions] == [(MESH_DIR, "prune")]
+    assert actions[0]["reclaimable"] == actions[0]["bytes"] > 0
+
+
+def test_fetched_time_directories_are_compressed_except_zero(generator, case):
+    actions = plan_case(case, {"copied_to_hpc": True, "results_fetched": True}, mesh_mode="compress")
+
+    assert [(a["target"], a["action"]) for a in actions] == [
+        (MESH_DIR, "compress"), ("5000", "compress"), ("20000", "compress")
+    ]
+    assert all(0 < a["reclaimable"] < a["bytes"] for a in actions)
+    assert plan_case(case, {"results_fetched": True}, compress_fields=False) == []
+    assert plan_case(case, {"copied_to_hpc": True}, mesh_mode="keep") == []
+
+
+def test_incompressible_data_is_not_planned_for_compression(case):
+    (case / "5000" / "U").write_bytes(os.urandom(200_000))
+
+    actions = plan_case(case, {"results_fetched": True})
+
+    assert [a["target"] for a in actions] == ["20000"]
+
+
+def test_compressed_and_pruned_data_is_restored(generator, case):
+    # Allrun RUN_STAGE=mesh stand-in: blockMesh + checkMesh recreate the mesh and their logs
+    (case / "Allrun").write_text(
+        '[ "$RUN_STAGE" = mesh ] || exit 1\n'
+        '[ ! -e log.blockMesh ] || exit 1\n'
+        'mkdir -p constant/polyMesh && touch constant/polyMesh/points log.blockMesh log.checkMesh\n'
+    )
+    (case / "log.blockMesh").write_text("old")
+    generator.update_status(case, {"copied_to_hpc": True, "results_fetched": True})
+    original = (case / "20000" / "U").read_text()
+
+    freed = apply_actions(generator, plan_case(case, generator.get_status(case)))
+
+    assert freed > 0
+    assert not (case / MESH_DIR).exists() and not (case / "20000").exists()
+    assert (case / "20000.tar.gz").exists()
+    assert generator.get_status(case)["storage"] == {MESH_DIR: "pruned", "5000": "compressed",
+                                                     "20000": "compressed"}
+
+    assert restore_case(generator, case)
+
+    assert (case / "20000" / "U").read_text() == original
+    assert not (case / "20000.tar.gz").exists()
+    assert (case / MESH_DIR / "points").exists()
+    assert generator.get_status(case)["storage"] == {}
+
+
+def test_failed_restore_keeps_the_storage_record(generator, case):
+    generator.update_status(case, {"storage": {"5000": "compressed"}})
+
+    assert not restore_case(generator, case)
+    assert generator.get_status(case)["storage"] == {"5000": "compressed"}
+
+
+def test_archive_with_missing_entries_is_discarded(case, monkeypatch):
+    real_walk = os.walk
+
+    def walk_with_extra_file(path):
+        for root, dirs, files in real_walk(path):
+            yield root, dirs, files + ["vanished"]
+
+    monkeypatch.setattr(caseStorage.os, "walk", walk_with_extra_file)
+
+    with pytest.raises(RuntimeError):
+        caseStorage.compress_dir(case / "5000")
+    assert (case / "5000" / "U").exists()
+    assert not list(case.glob("*.tar.gz*"))
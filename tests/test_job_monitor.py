@@ -0,0 +1,224 @@
+import subprocess
+import threading
+from pathlib import Path
+
+import pytest
+
+import taskManager
+from jobMonitor import FakeScheduler, JobMonitor
+
+
+def make_monitor(generator, backend, clock, **kwargs):
+    return JobMonitor(generator, backend=backend, clock=clock, **kwargs)
+
+
+# --------------------------------------------------
+# MONITOR (FakeScheduler, time stepped by hand)
+# --------------------------------------------------
+
+def test_completed_jobs_are_fetched(generator, clock, make_ready_cases, run_polls):
+    cases = make_ready_cases(["case_0001_000deg", "case_0001_090deg", "case_0002_000deg"])
+    backend = FakeScheduler(generator, queue_seconds=1, run_seconds=1, clock=clock)
+    monitor = make_monitor(generator, backend, clock)
+
+    # Poll 1 submits, poll 2 sees the jobs running, poll 3 sees them completed and fetches
+    run_polls(monitor, 2)
+    assert backend.fetched == []
+    run_polls(monitor, 1)
+
+    assert sorted(backend.fetched) == sorted(c.name for c in cases)
+    for case in cases:
+        status = generator.get_status(case)
+        assert status["job_status"] == "COMPLETED"
+        assert status["results_fetched"]
+
+
+def test_timeouts_are_resubmitted_up_to_max_resubmits(generator, clock, make_ready_cases, run_polls):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+    backend = FakeScheduler(generator, queue_seconds=1, run_seconds=1, outcome=lambda name: "TIMEOUT", clock=clock)
+    monitor = make_monitor(generator, backend, clock, max_resubmits=2)
+
+    run_polls(monitor, 10)
+
+    status = generator.get_status(case)
+    assert len(backend.jobs) == 3  # first submission + 2 resubmissions
+    assert status["n_resubmits"] == 2
+    assert status["job_status"] == "TIMEOUT"
+    assert backend.fetched == []
+    assert backend.prepared == [(case.name, 1), (case.name, 2)]
+
+
+def test_failed_resubmit_is_not_charged_and_backs_off(generator, clock, make_ready_cases, run_polls):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+
+    class RejectingResubmit(FakeScheduler):
+        def submit(self, case_path):
+            if self.jobs:
+                return None
+            return super().submit(case_path)
+
+    backend = RejectingResubmit(generator, queue_seconds=1, run_seconds=1, outcome=lambda name: "TIMEOUT",
+                                clock=clock)
+    monitor = make_monitor(generator, backend, clock, min_interval=60, max_resubmits=2)
+
+    run_polls(monitor, 10)
+
+    assert backend.prepared == [(case.name, 1)]
+    assert generator.get_status(case).get("n_resubmits", 0) == 0
+
+    clock.advance(60)
+    run_polls(monitor, 1)
+    assert len(backend.prepared) == 2
+
+
+def test_failed_fetch_is_not_retried_every_poll(generator, clock, make_ready_cases, run_polls):
+    make_ready_cases(["case_0001_000deg"])
+
+    class FailingFetch(FakeScheduler):
+        attempts = 0
+
+        def fetch(self, case_path):
+            self.attempts += 1
+            return False
+
+    backend = FailingFetch(generator, queue_seconds=1, run_seconds=1, clock=clock)
+    monitor = make_monitor(generator, backend, clock, min_interval=60, max_interval=600)
+
+    run_polls(monitor, 10)
+    assert backend.attempts == 1
+
+    # Retried after min_interval, then after twice that
+    clock.advance(60)
+    run_polls(monitor, 1)
+    assert backend.attempts == 2
+    clock.advance(60)
+    run_polls(monitor, 1)
+    assert backend.attempts == 2
+    clock.advance(60)
+    run_polls(monitor, 1)
+    assert backend.attempts == 3
+
+
+def test_fetched_run_short_of_end_time_is_continued(generator, clock, make_ready_cases, run_polls):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+
+    class StopsEarlyOnce(FakeScheduler):
+        def fetch(self, case_path):
+            self.fetched.append(Path(case_path).name)
+            complete = len(self.fetched) > 1
+            self.generator.update_status(case_path, {"results_fetched": True, "run_complete": complete})
+            return True
+
+    backend = StopsEarlyOnce(generator, queue_seconds=1, run_seconds=1, clock=clock)
+    monitor = make_monitor(generator, backend, clock, max_resubmits=2)
+
+    run_polls(monitor, 10)
+
+    status = generator.get_status(case)
+    assert backend.fetched == [case.name, case.name]
+    assert backend.prepared == [(case.name, 1)]
+    assert status["n_resubmits"] == 1
+    assert status["run_complete"] and status["results_fetched"]
+
+
+# --------------------------------------------------
+# REMOTE ACTIONS (ssh/rsync replaced)
+# --------------------------------------------------
+
+@pytest.mark.parametrize("decomposed", [True, False])
+def test_prepare_resubmit_clears_the_logs_that_would_skip_the_solver(generator, tmp_path, monkeypatch, decomposed):
+    remote = tmp_path / "remote" / "case_0001_000deg"
+    remote.mkdir(parents=True)
+    for name in ("log.decomposePar", "log.simpleFoam", "log.reconstructParMesh", "log.reconstructPar"):
+        (remote / name).write_text(name)
+    if decomposed:
+        (remote / "processor0").mkdir()
+    generator.deucalion_path = str(remote.parent)
+
+    run = subprocess.run
+    monkeypatch.setattr(taskManager.subprocess, "run",
+                        lambda cmd, **kwargs: run(["bash", "-c", cmd[-1]], **kwargs))
+
+    assert generator.prepare_resubmit(generator.output_dir / remote.name, attempt=1)
+
+    logs = sorted(p.name for p in remote.glob("log.*"))
+    assert logs == (["log.decomposePar"] if decomposed else []) + ["log.simpleFoam.1"]
+
+
+def fake_remote(monkeypatch, case, inventory):
+    """ssh answers with the given inventory lines of case, rsync does nothing."""
+    def run(cmd, **kwargs):
+        stdout = "".join(f"{case.name}\t{line}\n" for line in inventory) if cmd[0] == "ssh" else ""
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(taskManager.subprocess, "run", run)
+
+
+def test_fetch_without_remote_time_directories_fails(generator, make_ready_cases, monkeypatch):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+    fake_remote(monkeypatch, case, ["log.simpleFoam\tf\t10\t1.0", "\t-\t0\t0"])
+
+    assert generator.fetch_case_results(case) is False
+    assert not generator.get_status(case)["results_fetched"]
+
+
+def test_fetch_counts_an_inventory_error_as_a_failed_fetch(generator, make_ready_cases, monkeypatch):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+
+    def run(cmd, **kwargs):
+        raise FileNotFoundError("ssh")
+
+    monkeypatch.setattr(taskManager.subprocess, "run", run)
+
+    assert generator.fetch_case_results(case) is False
+
+
+@pytest.mark.parametrize("log, complete", [
+    ("Time = 4000\n", False),
+    ("Time = 4000\n\nSIMPLE solution converged in 4000 iterations\n", True),
+])
+def test_fetch_compares_the_latest_time_with_end_time(generator, make_ready_cases, monkeypatch, log, complete):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+    (case / "system").mkdir()
+    (case / "system" / "controlDict").write_text("endTime         20000;\n")
+    (case / "log.simpleFoam").write_text(log)
+    fake_remote(monkeypatch, case, ["4000\td\t0\t1.0", "\t-\t0\t0"])
+
+    assert generator.fetch_case_results(case)
+    status = generator.get_status(case)
+    assert status["results_fetched"] and status["last_fetched_timestep"] == 4000
+    assert status["run_complete"] is complete
+
+
+# --------------------------------------------------
+# CASE STATUS FILES
+# --------------------------------------------------
+
+def test_concurrent_status_updates_are_not_lost_or_torn(generator, make_ready_cases):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+
+    def writer(i):
+        for j in range(50):
+            generator.update_status(case, {f"key_{i}": j})
+
+    def reader():
+        for _ in range(200):
+            generator.list_cases_by_status(submitted=False)
+            generator.get_status(case)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)] + [threading.Thread(target=reader)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    status = generator.get_status(case)
+    assert all(status[f"key_{i}"] == 49 for i in range(4))
+    assert not list(case.glob("*.tmp"))
+
+
+def test_unreadable_status_files_are_skipped(generator, make_ready_cases):
+    good, bad = make_ready_cases(["case_0001_000deg", "case_0002_000deg"])
+    (bad / "case_status.json").write_text('{"mesh_status": "DO')
+
+    assert generator.list_ready_cases() == [good]
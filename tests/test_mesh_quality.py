@@ -0,0 +1,146 @@
+from meshQuality import find_outliers, load_table, rebuild_table, summarize
+from pipelineMetrics import parse_check_mesh
+
+
+# Abridged checkMesh output of a mesh that passes every check
+GOOD_LOG = """\
+Checking geometry...
+Mesh stats
+    points:           1331
+    faces:            3630
+    internal faces:   3000
+    cells:            1000
+    faces per cell:   6
+
+Checking geometry...
+    Overall domain bounding box (0 0 0) (1 1 1)
+    Max aspect ratio = 12.5 OK.
+    Mesh non-orthogonality Max: 35.2 average: 6.1
+    Non-orthogonality check OK.
+    Max skewness = 0.84 OK.
+
+Mesh OK.
+
+End
+"""
+
+# Two times, the last one failing: high aspect ratio and skewness
+FAILED_LOG = GOOD_LOG.replace("Mesh OK.\n", "") + """\
+Time = 100
+
+Mesh stats
+    cells:            2000
+
+Checking geometry...
+ ***High aspect ratio cells found, Max aspect ratio: 1.25e+03, number of cells 12
+    Mesh non-orthogonality Max: 72.5 average: 8.3
+ ***Max skewness = 5.1, 3 highly skew faces detected
+    <<Writing 3 skew faces to set skewFaces
+
+Failed 2 mesh checks.
+
+End
+"""
+
+
+def write_log(tmp_path, text):
+    path = tmp_path / "log.checkMesh"
+    path.write_text(text)
+    return path
+
+
+def test_check_mesh_figures_of_a_good_mesh(tmp_path):
+    quality = parse_check_mesh(write_log(tmp_path, GOOD_LOG))
+
+    assert quality == {
+        "cells": 1000,
+        "max_non_orthogonality": 35.2,
+        "avg_non_orthogonality": 6.1,
+        "max_skewness": 0.84,
+        "max_aspect_ratio": 12.5,
+        "mesh_ok": True,
+        "failed_checks": 0
+    }
+
+
+def test_check_mesh_last_time_and_failures_count(tmp_path):
+    quality = parse_check_mesh(write_log(tmp_path, FAILED_LOG))
+
+    assert quality["cells"] == 2000
+    assert quality["max_aspect_ratio"] == 1250
+    assert quality["max_skewness"] == 5.1
+    assert quality["max_non_orthogonality"] == 72.5
+    assert not quality["mesh_ok"]
+    assert quality["failed_checks"] == 2
+
+
+def test_check_mesh_without_figures(tmp_path):
+    assert parse_check_mesh(tmp_path / "log.checkMesh") is None
+
+    quality = parse_check_mesh(write_log(tmp_path, "--> FOAM FATAL ERROR: cannot find polyMesh\n"))
+    assert quality["cells"] is None and quality["max_skewness"] is None and not quality["mesh_ok"]
+
+
+def make_table(values, metric="max_skewness"):
+    return {f"case_{i:04d}": {"case": f"case_{i:04d}", metric: v, "mesh_ok": True} for i, v in enumerate(values)}
+
+
+def test_value_over_a_limit_is_an_outlier():
+    table = make_table([0.8, 0.9, 1.0, 4.5])
+
+    outliers = find_outliers(table)
+
+    assert [(o["case"], o["reason"]) for o in outliers] == [("case_0003", "> 4")]
+
+
+def test_value_far_from_the_dataset_is_an_outlier():
+    table = make_table([10, 11, 12, 11, 10, 12, 11, 40], metric="max_non_orthogonality")
+
+    outliers = find_outliers(table)
+
+    assert [o["case"] for o in outliers] == ["case_0007"]
+    assert outliers[0]["reason"].startswith("z = +")
+
+
+def test_identical_values_have_no_outliers():
+    assert find_outliers(make_table([30, 30, 30, 30], metric="max_non_orthogonality")) == []
+
+
+def test_outliers_are_worst_first():
+    table = make_table([1, 1, 1, 1, 5, 9])
+
+    assert [o["case"] for o in find_outliers(table, z_threshold=100)] == ["case_0005", "case_0004"]
+
+
+def test_summary_percentiles_and_failures():
+    table = make_table([1.0, 2.0, 3.0, 4.0, 5.0])
+    table["case_0004"]["mesh_ok"] = False
+
+    summary = summarize(table)
+
+    assert summary["max_skewness"]["p50"] == 3.0
+    assert summary["max_skewness"]["max"] == 5.0
+    assert summary["max_skewness"]["count"] == 5
+    assert summary["cells"]["count"] == 0
+    assert summary["failed"] == 1
+
+
+def test_later_meshing_wins_in_the_table(generator, make_ready_cases):
+    (case,) = make_ready_cases(["case_0001_000deg"])
+
+    generator.record_mesh_quality(case, {"cells": 100, "mesh_ok": False})
+    generator.record_mesh_quality(case, {"cells": 200, "mesh_ok": True})
+
+    assert load_table(generator.mesh_quality_file)[case.name]["cells"] == 200
+
+
+def test_rebuild_table_reparses_every_log(generator, make_ready_cases):
+    good, failed, unmeshed = make_ready_cases(["case_0001_000deg", "case_0002_000deg", "case_0003_000deg"])
+    (good / "log.checkMesh").write_text(GOOD_LOG)
+    (failed / "log.checkMesh").write_text(FAILED_LOG)
+
+    table = rebuild_table(generator, n_workers=2)
+
+    assert sorted(table) == [good.name, failed.name]
+    assert load_table(generator.mesh_quality_file) == table
+    assert generator.get_status(failed)["mesh_quality"]["failed_checks"] == 2
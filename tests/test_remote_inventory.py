@@ -0,0 +1,108 @@
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+import taskManager
+
+
+@pytest.fixture
+def remote(generator, tmp_path, monkeypatch):
+    """A remote case root on the local disk; ssh runs its command with bash and counts the calls."""
+    root = tmp_path / "remote"
+    root.mkdir()
+    generator.deucalion_path = str(root)
+    calls = []
+    run = subprocess.run
+
+    def ssh(cmd, **kwargs):
+        calls.append(cmd)
+        return run(["bash", "-c", cmd[-1]], **kwargs)
+
+    monkeypatch.setattr(taskManager.subprocess, "run", ssh)
+    return SimpleNamespace(root=root, calls=calls)
+
+
+def make_remote_case(root, name, times=(), processor_times=(), logs=(), post_processing=False):
+    case = root / name
+    case.mkdir()
+    for t in times:
+        (case / str(t)).mkdir()
+    for t in processor_times:
+        (case / "processor0" / str(t)).mkdir(parents=True)
+    for log in logs:
+        (case / log).write_text("x" * 10)
+    if post_processing:
+        (case / "postProcessing").mkdir()
+    (case / "system").mkdir()
+    return case
+
+
+def test_inventory_lists_times_logs_and_post_processing(generator, remote):
+    make_remote_case(remote.root, "case_a", times=(0, 500, 1000), processor_times=(1500,),
+                     logs=("log.simpleFoam", "log.blockMesh"), post_processing=True)
+    make_remote_case(remote.root, "case_b")
+
+    inventory = generator.get_remote_inventory(["case_a", "case_b", "case_missing"])
+
+    a = inventory["case_a"]
+    assert a["exists"] and a["has_postProcessing"]
+    assert sorted(a["time_dirs"]) == ["0", "1000", "500"]
+    assert list(a["processor_time_dirs"]) == ["1500"]
+    assert a["logs"]["log.simpleFoam"]["size"] == 10
+    assert sorted(a["logs"]) == ["log.blockMesh", "log.simpleFoam"]
+    # An empty case is still listed; a missing one is marked as such
+    assert inventory["case_b"]["exists"] and not inventory["case_b"]["time_dirs"]
+    assert not inventory["case_missing"]["exists"]
+    assert len(remote.calls) == 1
+
+
+def test_inventory_is_cached_until_max_age(generator, remote):
+    make_remote_case(remote.root, "case_a", times=(0,))
+
+    generator.get_remote_inventory(["case_a"])
+    generator.get_remote_inventory(["case_a"])
+    assert len(remote.calls) == 1
+
+    (remote.root / "case_a" / "100").mkdir()
+    assert generator.get_remote_inventory(["case_a"], max_age=0)["case_a"]["time_dirs"].keys() == {"0", "100"}
+    assert len(remote.calls) == 2
+
+
+def test_inventory_cache_survives_a_new_generator(generator, remote):
+    make_remote_case(remote.root, "case_a", times=(0,))
+    generator.get_remote_inventory(["case_a"])
+
+    fresh = taskManager.OpenFOAMCaseGenerator(generator.template_path, generator.input_root,
+                                              generator.output_dir, deucalion_path=str(remote.root),
+                                              metrics_file=False)
+
+    assert "case_a" in fresh.get_remote_inventory(["case_a"])
+    assert len(remote.calls) == 1
+
+
+def test_timesteps_and_logs_come_from_the_inventory(generator, remote):
+    make_remote_case(remote.root, "case_a", times=(0, 5000, 20000),
+                     logs=("log.blockMesh", "log.checkMesh", "log.simpleFoam", "log.decomposePar"))
+
+    assert generator.get_result_timesteps(f"{remote.root}/case_a") == [0, 5000, 20000]
+    assert generator.get_remote_logs(f"{remote.root}/case_a") == ["log.decomposePar", "log.simpleFoam"]
+    assert len(remote.calls) == 1
+
+
+def test_cases_outside_the_remote_root_are_listed_directly(generator, remote, tmp_path):
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    make_remote_case(elsewhere, "case_a", times=(0, 100))
+
+    assert generator._inventory_entry(elsewhere / "case_a") is None
+    assert generator.get_result_timesteps(elsewhere / "case_a") == [0, 100]
+    assert not generator.inventory_file.exists()
+
+
+def test_ssh_failure_keeps_the_cache_unchanged(generator, remote, monkeypatch):
+    monkeypatch.setattr(taskManager.subprocess, "run",
+                        lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 255, stdout="", stderr="no route"))
+
+    assert generator.get_remote_inventory(["case_a"]) == {}
+    assert not generator.inventory_file.exists()
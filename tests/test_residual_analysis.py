@@ -0,0 +1,168 @@
+import pytest
+
+from pipelineMetrics import parse_residuals
+from residualAnalysis import analyze_case, analyze_cases, converged_at, downsample, tolerance_for
+
+
+def solver_log(iterations, truncate=False):
+    """log.simpleFoam text; iterations is a list of (time, p initial residual, Ux initial residual)."""
+    lines = ["Starting time loop", ""]
+    for t, p, ux in iterations:
+        lines += [
+            f"Time = {t}",
+            "",
+            f"smoothSolver:  Solving for Ux, Initial residual = {ux}, Final residual = {ux / 10}, No Iterations 2",
+            f"GAMG:  Solving for p, Initial residual = {p}, Final residual = {p / 100}, No Iterations 5",
+            f"GAMG:  Solving for p, Initial residual = {p / 2}, Final residual = {p / 200}, No Iterations 4",
+            f"ExecutionTime = {t * 0.5} s  ClockTime = {t} s",
+            ""
+        ]
+    text = "\n".join(lines) + "\n"
+    if truncate:
+        # A killed solver: the last line stops mid-number
+        text += (f"Time = {iterations[-1][0] + 1}\n\n"
+                 "smoothSolver:  Solving for Ux, Initial residual = 0.01, Final residual = 1.2e-")
+    return text
+
+
+# --------------------------------------------------
+# PARSING
+# --------------------------------------------------
+
+def test_residual_history(tmp_path):
+    log = tmp_path / "log.simpleFoam"
+    log.write_text(solver_log([(1, 1.0, 0.1), (2, 0.5, 0.05)]))
+
+    history = parse_residuals(log)
+
+    assert history["time"] == [1, 2]
+    assert history["clock"] == [1.0, 2.0]
+    # First initial residual of p, last final residual
+    assert history["initial"] == {"Ux": [0.1, 0.05], "p": [1.0, 0.5]}
+    assert history["final"]["p"] == [0.005, 0.0025]
+    assert not history["fatal"]
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    log = tmp_path / "log.simpleFoam"
+    log.write_text(solver_log([(1, 1.0, 0.1), (2, 0.5, 0.05)], truncate=True))
+
+    history = parse_residuals(log)
+
+    assert history["time"] == [1, 2, 3]
+    assert history["initial"]["Ux"] == [0.1, 0.05, None]
+
+
+def test_fatal_error_and_missing_log(tmp_path):
+    log = tmp_path / "log.simpleFoam"
+    log.write_text(solver_log([(1, 1.0, 0.1)]) + "--> FOAM FATAL ERROR: Maximum number of iterations exceeded\n")
+
+    assert parse_residuals(log)["fatal"]
+    assert parse_residuals(tmp_path / "missing") is None
+
+
+# --------------------------------------------------
+# CONVERGENCE
+# --------------------------------------------------
+
+TOLERANCES = {"p": 1e-3, "U": 1e-3}
+
+
+def test_tolerance_of_velocity_components():
+    assert tolerance_for("Ux", TOLERANCES) == 1e-3
+    assert tolerance_for("p", TOLERANCES) == 1e-3
+    assert tolerance_for("nut", TOLERANCES) is None
+
+
+def test_converged_from_the_first_time_all_fields_stay_below():
+    times = [1, 2, 3, 4, 5]
+    initial = {
+        "p":  [1e-1, 1e-4, 1e-2, 1e-4, 1e-4],  # dips below once, then rises again
+        "Ux": [1e-1, 1e-2, 1e-4, 1e-4, 1e-4],
+        "nut": [1.0] * 5  # no tolerance: ignored
+    }
+
+    assert converged_at(times, initial, TOLERANCES) == 4
+
+
+def test_not_converged_if_the_last_iteration_is_above():
+    assert converged_at([1, 2, 3], {"p": [1e-4, 1e-4, 1e-2]}, TOLERANCES) is None
+
+
+def test_truncated_iterations_are_not_counted_as_converged():
+    # Iteration 3 lost its residuals to a killed solver; 1 and 2 are above the tolerance
+    assert converged_at([1, 2, 3], {"p": [1e-1, 1e-2, None]}, TOLERANCES) is None
+    # Converged at 2, the truncated iteration doesn't change that
+    assert converged_at([1, 2, 3], {"p": [1e-1, 1e-4, None]}, TOLERANCES) == 2
+
+
+def test_no_checked_fields_means_no_convergence():
+    assert converged_at([1, 2], {"nut": [1e-9, 1e-9]}, TOLERANCES) is None
+    assert converged_at([], {"p": []}, TOLERANCES) is None
+
+
+# --------------------------------------------------
+# DOWNSAMPLING
+# --------------------------------------------------
+
+def test_short_series_only_loses_missing_and_non_positive_values():
+    assert downsample([1, 2, 3, 4], [0.1, None, 0.0, 0.05], max_points=10) == ([1, 4], [0.1, 0.05])
+
+
+def test_long_series_keeps_spikes_and_stays_bounded():
+    times = list(range(10000))
+    values = [1e-3] * 10000
+    values[4321] = 1.0
+    values[8765] = 1e-9
+
+    t, v = downsample(times, values, max_points=100)
+
+    assert len(t) <= 100
+    assert t == sorted(t)
+    assert (4321, 1.0) in zip(t, v)
+    assert (8765, 1e-9) in zip(t, v)
+
+
+# --------------------------------------------------
+# CASES
+# --------------------------------------------------
+
+def test_analyze_case_summary_row(tmp_path):
+    case = tmp_path / "case_0001_000deg"
+    case.mkdir()
+    (case / "log.simpleFoam").write_text(solver_log([(1, 1.0, 0.1), (2, 1e-5, 1e-5), (3, 1e-5, 1e-5)]))
+
+    row = analyze_case(case)
+
+    assert row["case"] == case.name
+    assert row["iterations"] == 3 and row["last_time"] == 3
+    assert row["converged_at"] == 2
+    assert row["initial_residual"] == {"Ux": 1e-5, "p": 1e-5}
+    assert row["series"]["p"] == ([1, 2, 3], [1.0, 1e-5, 1e-5])
+    assert analyze_case(tmp_path) is None
+
+
+def test_analyze_cases_keeps_input_order_and_skips_cases_without_logs(tmp_path):
+    cases = []
+    for name, n in (("case_b", 3), ("case_none", 0), ("case_a", 5)):
+        case = tmp_path / name
+        case.mkdir()
+        if n:
+            (case / "log.simpleFoam").write_text(solver_log([(t, 1.0, 1.0) for t in range(1, n + 1)]))
+        cases.append(case)
+
+    rows = analyze_cases(cases, n_workers=2, plots=False)
+
+    assert [(r["case"], r["iterations"]) for r in rows] == [("case_b", 3), ("case_a", 5)]
+    assert all("series" not in r for r in rows)
+
+
+def test_overlay_skips_fields_without_points(tmp_path):
+    pytest.importorskip("matplotlib")
+    from residualAnalysis import render_overlay_plot
+
+    results = [{"series": {"p": ([1, 2], [1.0, 0.1]), "Uz": ([], [])}},
+               {"series": {"p": ([1, 2], [1.0, 0.2]), "Uz": ([], [])}}]
+
+    assert render_overlay_plot(results, tmp_path / "overlay.png")
+    assert render_overlay_plot([{"series": {"Uz": ([], [])}}], tmp_path / "empty.png")
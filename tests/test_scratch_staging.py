@@ -0,0 +1,34 @@
+import subprocess
+
+import pytest
+
+import taskManager
+
+
+def fake_ssh(monkeypatch, stdout):
+    monkeypatch.setattr(taskManager.subprocess, "run",
+                        lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr=""))
+
+
+def test_job_stopped_before_the_walltime_counts_as_timeout(generator, monkeypatch):
+    fake_ssh(monkeypatch, "--\n101|COMPLETED|0:0\n102|FAILED|3:0\n103|FAILED|1:0\n104|TIMEOUT|0:15\n")
+
+    states = generator.check_job_statuses(["101", "102", "103", "104"])
+
+    assert states == {"101": "COMPLETED", "102": "TIMEOUT", "103": "FAILED", "104": "TIMEOUT"}
+
+
+def test_squeue_state_wins_over_sacct(generator, monkeypatch):
+    fake_ssh(monkeypatch, "101 RUNNING\n--\n101|PENDING|0:0\n")
+
+    assert generator.check_job_statuses(["101"]) == {"101": "RUNNING"}
+
+
+def test_multi_node_node_local_scratch_is_rejected(generator, tmp_path):
+    case = tmp_path / "case"
+    case.mkdir()
+    (case / "openfoam.sh.j2").write_text((generator.template_path / "openfoam.sh.j2").read_text())
+    generator.hpc_defaults.update(scratch_dir="$LOCALSCRATCH", nodes=2)
+
+    with pytest.raises(ValueError):
+        generator.render_hpc_script(case, "case")
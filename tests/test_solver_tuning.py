@@ -0,0 +1,41 @@
+import pytest
+
+import solverTuning
+from solverTuning import BASELINE_SETTINGS, run_trial
+
+
+@pytest.fixture
+def meshed_case(generator):
+    case = generator.output_dir / "case_0001_000deg"
+    (case / "constant" / "polyMesh").mkdir(parents=True)
+    return case
+
+
+class FinishedProcess:
+    pid = returncode = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def wait(self, timeout=None):
+        return 0
+
+
+def test_trial_switches_schemes_at_the_production_fraction(generator, meshed_case, tmp_path, monkeypatch):
+    rendered = {}
+    monkeypatch.setattr(generator, "rerender_from_template",
+                        lambda case, path, **overrides: rendered.setdefault(path, overrides))
+    monkeypatch.setattr(solverTuning.subprocess, "Popen", FinishedProcess)
+
+    run_trial(generator, meshed_case, BASELINE_SETTINGS, tmp_path / "trial", n_iterations=150)
+
+    # 1000 of 20000 production iterations run on fvSchemes_1
+    assert rendered["system/controlDict"]["scheme_switch_time"] == 8
+    assert rendered["system/controlDict"]["end_time"] == 150
+
+
+def test_trial_on_a_pruned_mesh_is_refused(generator, meshed_case, tmp_path):
+    (meshed_case / "constant" / "polyMesh").rmdir()
+
+    with pytest.raises(ValueError, match="storage --restore"):
+        run_trial(generator, meshed_case, BASELINE_SETTINGS, tmp_path / "trial")
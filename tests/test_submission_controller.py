@@ -0,0 +1,84 @@
+import pytest
+
+from jobMonitor import FakeScheduler, JobMonitor, SubmissionController
+
+
+def test_queue_target_counts_queued_and_in_flight_jobs(generator, make_ready_cases):
+    cases = make_ready_cases([f"case_000{i}_000deg" for i in range(6)])
+    controller = SubmissionController(generator, queue_target=3, order=("name",))
+
+    assert controller.select(cases, {"RUNNING": 1}, submitted=[]) == cases[:2]
+    assert controller.select(cases, {"RUNNING": 1}, n_in_flight=1, submitted=[]) == cases[:1]
+    assert controller.select(cases, {"RUNNING": 2, "PENDING": 1}, submitted=[]) == []
+
+
+def test_max_pending_only_counts_pending_jobs(generator, make_ready_cases):
+    cases = make_ready_cases([f"case_000{i}_000deg" for i in range(5)])
+    controller = SubmissionController(generator, max_pending=2, order=("name",))
+
+    assert controller.select(cases, {"RUNNING": 10, "PENDING": 1}, submitted=[]) == cases[:1]
+    assert controller.select(cases, {"PENDING": 2}, submitted=[]) == []
+
+
+def test_without_limits_everything_is_submitted_without_asking_squeue(generator, make_ready_cases):
+    cases = make_ready_cases(["case_0001_000deg", "case_0002_000deg"])
+    controller = SubmissionController(generator, order=("name",))
+
+    assert not controller.needs_queue_counts()
+    assert controller.select(cases, None, submitted=[]) == cases
+
+
+def test_nothing_is_submitted_when_the_queue_cant_be_seen(generator, make_ready_cases):
+    cases = make_ready_cases(["case_0001_000deg"])
+    controller = SubmissionController(generator, queue_target=3)
+
+    assert controller.select(cases, None, submitted=[]) == []
+
+
+def test_submit_limit_rejection_becomes_the_queue_target(generator, clock, make_ready_cases, run_polls):
+    make_ready_cases([f"case_000{i}_000deg" for i in range(5)])
+    backend = FakeScheduler(generator, queue_seconds=60, run_seconds=60, submit_limit=2, clock=clock)
+    controller = SubmissionController(generator)
+    # One remote call at a time, so the fake's limit check can't race
+    monitor = JobMonitor(generator, backend=backend, controller=controller, max_concurrent=1, clock=clock)
+
+    run_polls(monitor, 3)
+
+    assert len(backend.jobs) == 2
+    assert controller.learned_limit == 2
+    assert not generator.submit_limit_hit
+    assert len(generator.list_ready_cases()) == 3
+
+
+def test_queue_target_caps_the_monitor(generator, clock, make_ready_cases, run_polls):
+    make_ready_cases([f"case_000{i}_000deg" for i in range(6)])
+    backend = FakeScheduler(generator, queue_seconds=1, run_seconds=60, clock=clock)
+    controller = SubmissionController(generator, queue_target=3)
+    monitor = JobMonitor(generator, backend=backend, controller=controller, clock=clock)
+
+    run_polls(monitor, 5)
+
+    assert len(backend.jobs) == 3
+    assert backend.queue_counts() == {"RUNNING": 3}
+
+
+def test_ready_cases_ordered_by_terrain_then_size(generator, make_ready_cases):
+    cases = make_ready_cases(
+        ["case_0001_000deg", "case_0001_090deg", "case_0002_000deg", "case_0002_090deg"],
+        cells=[100, 300, 200, 400]
+    )
+    controller = SubmissionController(generator)
+
+    # Terrain 0002 already has a submitted case, so its rotations go first
+    ordered = controller.sort_cases(cases, submitted=[generator.output_dir / "case_0002_180deg"])
+
+    assert [c.name for c in ordered] == [
+        "case_0002_090deg", "case_0002_000deg", "case_0001_090deg", "case_0001_000deg"
+    ]
+    # Without submitted cases, terrains go by name and the largest mesh first
+    assert controller.select(cases, counts=None, submitted=[])[:1] == [cases[1]]
+
+
+def test_unknown_order_key_is_rejected(generator):
+    with pytest.raises(ValueError):
+        SubmissionController(generator, order=("terrain", "fastest"))